@@ -0,0 +1,158 @@
+"""Memory per bar and allocation pressure along the bar pipeline.
+
+``bar_memory`` retains ``--bars`` bars and reports bytes per bar as seen by
+``tracemalloc`` (the list slot included). Every other scenario runs one
+operation repeatedly and reports its median time, the transient peak it
+allocates (``tracemalloc``) and the number of GC-tracked objects allocated
+per bar, estimated from generation-0 collections. Results are JSON so that
+base and head runs can be diffed with ``benchmarks/compare.py``.
+
+    python benchmarks/bench_bars.py --output base.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from klinecharts_pro_akshare_gateway.barbuilder.buckets import (  # noqa: E402
+    SessionBuckets,
+    aggregate_bars,
+)
+from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder  # noqa: E402
+from klinecharts_pro_akshare_gateway.config import Settings  # noqa: E402
+from klinecharts_pro_akshare_gateway.models import Bar  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.synthetic import (  # noqa: E402
+    SyntheticConfig,
+    SyntheticProvider,
+)
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock  # noqa: E402
+
+TZ = ZoneInfo("Asia/Shanghai")
+SESSION_OPEN = datetime(2024, 3, 4, 9, 30, tzinfo=TZ)
+
+
+def _measure(fn, bars_per_call: int, repeats: int) -> dict:
+    fn()
+    samples = []
+    collections = gc.get_stats()[0]["collections"]
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    collections = gc.get_stats()[0]["collections"] - collections
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return {
+        "bars": bars_per_call,
+        "call_us": round(statistics.median(samples) * 1e6, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "tracked_allocs_per_bar": round(collections * gc.get_threshold()[0] / (repeats * bars_per_call), 2),
+    }
+
+
+def bench_bar_memory(args) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    bars = [
+        Bar(ts=1_700_000_000_000 + i * 60_000, open=10.0, high=10.5, low=9.5, close=10.2,
+            volume=1200.0, amount=12_240.0, is_closed=True)
+        for i in range(args.bars)
+    ]
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return {"bars": len(bars), "bytes_per_bar": round(retained / len(bars), 1), "sizeof_bar": sys.getsizeof(bars[0])}
+
+
+def bench_pipeline(args) -> dict:
+    clock = TradingClock.from_settings(Settings())
+    provider = SyntheticProvider(
+        SyntheticConfig(universe_size=args.symbols, snapshot_start=SESSION_OPEN, tick_seconds=3)
+    )
+    symbol = provider.symbols[0]
+    start = SESSION_OPEN.replace(hour=0, minute=0)
+    end = start + timedelta(days=args.days)
+    minute_bars = provider.get_minute_history(symbol, "1m", start, end)
+    day = minute_bars[:240]
+    buckets = SessionBuckets(clock)
+    frames = [provider.get_realtime_snapshot_batch(provider.symbols) for _ in range(args.ticks)]
+    builder = BarBuilder(clock)
+
+    def tick():
+        for frame in frames:
+            builder.apply_snapshots(frame)
+
+    events = sum(len(frame) for frame in frames) * 8
+    return {
+        "provider_minutes": _measure(
+            lambda: provider.get_minute_history(symbol, "1m", start, end), len(minute_bars), args.repeats
+        ),
+        "aggregate_day_5m": _measure(lambda: aggregate_bars(day, "5m", buckets), len(day), args.repeats * 20),
+        "builder_ticks": _measure(tick, events, args.repeats),
+    }
+
+
+def bench_http(args) -> dict:
+    os.environ.update(PROVIDER_BACKEND="synthetic", SYNTHETIC_UNIVERSE_SIZE="50", CACHE_BACKEND="memory")
+    from fastapi.testclient import TestClient
+
+    from klinecharts_pro_akshare_gateway.main import create_app
+
+    results = {}
+    with TestClient(create_app()) as client:
+        symbol = client.get("/api/v1/symbols/search", params={"q": ".", "limit": 1}).json()["items"][0]["symbol"]
+        for name, params in {
+            "history_1d_2000": {"period": "1d", "from": "2010-01-01", "to": "2024-03-01"},
+            "history_1m_2000": {"period": "1m", "from": "2024-02-01 09:30", "to": "2024-03-01 15:00"},
+        }.items():
+            query = {"symbol": symbol, "limit": 2000, **params}
+            count = len(client.get("/api/v1/bars/history", params=query).json()["items"])
+            results[name] = _measure(lambda: client.get("/api/v1/bars/history", params=query), count, args.repeats)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--days", type=int, default=20, help="Days of synthetic 1m history")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    result = {
+        "benchmark": "bars",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": {
+            "bar_memory": bench_bar_memory(args),
+            "pipeline": bench_pipeline(args),
+            "http": bench_http(args),
+        },
+    }
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Throughput and latency benchmarks against the synthetic provider.
+
+No network access is needed: the gateway runs in-process on
+``SyntheticProvider`` with configurable upstream latency. Results are JSON
+so runs can be diffed with ``benchmarks/compare.py``.
+
+    python benchmarks/bench_gateway.py --output base.json
+    python benchmarks/bench_gateway.py --scenarios history,fanout --symbols 500 --subscribers 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder  # noqa: E402
+from klinecharts_pro_akshare_gateway.barbuilder.market import MarketBars  # noqa: E402
+from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache  # noqa: E402
+from klinecharts_pro_akshare_gateway.config import Settings  # noqa: E402
+from klinecharts_pro_akshare_gateway.history import HistoryService  # noqa: E402
+from klinecharts_pro_akshare_gateway.poller import Poller  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.synthetic import (  # noqa: E402
+    SyntheticConfig,
+    SyntheticProvider,
+)
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock  # noqa: E402
+from klinecharts_pro_akshare_gateway.ws.hub import hub  # noqa: E402
+
+TZ = ZoneInfo("Asia/Shanghai")
+SESSION_OPEN = datetime(2024, 3, 4, 9, 30, tzinfo=TZ)
+SCENARIOS = ("history", "fanout", "builder", "market", "cache")
+
+
+class _NullWebSocket:
+    """Stands in for a client connection; serializes like ``send_json``."""
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_json(self, data) -> None:
+        self.bytes += len(json.dumps(data, separators=(",", ":")))
+        self.messages += 1
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def _history_service(provider: SyntheticProvider, settings: Settings) -> HistoryService:
+    clock = TradingClock.from_settings(settings)
+    clock.update_calendar(provider.get_trading_calendar())
+    return HistoryService(AsyncProvider(provider), MemoryCache(), settings, clock)
+
+
+async def bench_history(args) -> dict:
+    settings = Settings()
+    provider = SyntheticProvider(
+        SyntheticConfig(universe_size=args.symbols, history_latency=args.latency_ms / 1000)
+    )
+    service = _history_service(provider, settings)
+    symbols = provider.symbols[: args.history_symbols]
+    start_ms = int(datetime(2023, 1, 1, tzinfo=TZ).timestamp() * 1000)
+    end_ms = int(datetime(2024, 3, 1, tzinfo=TZ).timestamp() * 1000)
+    minute_start = int(datetime(2024, 2, 26, tzinfo=TZ).timestamp() * 1000)
+    minute_end = int(datetime(2024, 3, 1, 15, tzinfo=TZ).timestamp() * 1000)
+    requests = []
+    for index in range(args.history_requests):
+        symbol = symbols[index % len(symbols)]
+        if index % 3 == 2:
+            requests.append((symbol, "5m", minute_start, minute_end))
+        else:
+            requests.append((symbol, "1d", start_ms, end_ms))
+
+    async def run() -> dict:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies: list[float] = []
+
+        async def one(request) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await service.get_page(*request, limit=2000)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(request) for request in requests))
+        elapsed = time.perf_counter() - started
+        return {
+            "requests": len(requests),
+            "requests_per_sec": round(len(requests) / elapsed, 2),
+            **_percentiles(latencies),
+        }
+
+    cold = await run()
+    warm = await run()
+    return {"cold": cold, "warm": warm, "concurrency": args.concurrency, "latency_ms": args.latency_ms}
+
+
+async def bench_fanout(args) -> dict:
+    settings = Settings()
+    provider = SyntheticProvider(
+        SyntheticConfig(
+            universe_size=max(args.symbols, args.fanout_symbols),
+            snapshot_latency=args.latency_ms / 1000,
+            snapshot_start=SESSION_OPEN,
+            tick_seconds=settings.snapshot_poll_interval_seconds,
+        )
+    )
+    async_provider = AsyncProvider(provider)
+    clock = TradingClock.from_settings(settings)
+    poller = Poller(async_provider, BarBuilder(clock), settings, clock=clock)
+    symbols = provider.symbols[: args.fanout_symbols]
+    sockets = [_NullWebSocket() for _ in range(args.subscribers)]
+    for ws in sockets:
+        for symbol in symbols:
+            hub.subscribe(ws, symbol, "1m")
+    try:
+        latencies: list[float] = []
+        events = 0
+        for _ in range(args.ticks):
+            started = time.perf_counter()
+            snapshots = await async_provider.get_realtime_snapshot_batch(hub.get_active_symbols())
+            events += await poller.publish(snapshots)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        for ws in sockets:
+            hub.remove(ws)
+    messages = sum(ws.messages for ws in sockets)
+    elapsed = sum(latencies)
+    return {
+        "symbols": len(symbols),
+        "subscribers": len(sockets),
+        "ticks": args.ticks,
+        "events_per_tick": round(events / args.ticks, 1),
+        "messages_per_sec": round(messages / elapsed, 1),
+        "bytes_per_tick": round(sum(ws.bytes for ws in sockets) / args.ticks),
+        "snapshot_to_broadcast": _percentiles(latencies),
+    }
+
+
+def bench_builder(args) -> dict:
+    settings = Settings()
+    provider = SyntheticProvider(
+        SyntheticConfig(
+            universe_size=args.symbols,
+            snapshot_start=SESSION_OPEN,
+            tick_seconds=settings.snapshot_poll_interval_seconds,
+        )
+    )
+    frames = [provider.get_realtime_snapshot_batch(provider.symbols) for _ in range(args.ticks)]
+    builder = BarBuilder(TradingClock.from_settings(settings))
+    events = 0
+    started = time.perf_counter()
+    for frame in frames:
+        events += len(builder.apply_snapshots(frame))
+    elapsed = time.perf_counter() - started
+    return {
+        "symbols": args.symbols,
+        "ticks": args.ticks,
+        "ticks_per_sec": round(args.ticks / elapsed, 2),
+        "snapshots_per_sec": round(args.ticks * args.symbols / elapsed, 1),
+        "events_per_sec": round(events / elapsed, 1),
+    }
+
+
+def bench_market(args) -> dict:
+    """Full-market 1m/1d bars over one trading day, one snapshot per minute:
+    the array store against the per-object builder limited to 1m/1d."""
+    settings = Settings()
+    provider = SyntheticProvider(
+        SyntheticConfig(universe_size=args.symbols, snapshot_start=SESSION_OPEN, tick_seconds=60)
+    )
+    clock = TradingClock.from_settings(settings)
+    ticks = args.market_ticks
+    market = MarketBars(clock, args.market_memory_mb * 1024 * 1024)
+    builder = BarBuilder(clock, periods=["1m", "1d"])
+    builder_elapsed = 0.0
+    market_latencies: list[float] = []
+    while len(market_latencies) < ticks:
+        frame = provider.get_realtime_snapshot_batch(None)
+        started = time.perf_counter()
+        updated = market.apply(frame)
+        elapsed = time.perf_counter() - started
+        if not updated:
+            # Lunch break: nothing is in session.
+            continue
+        if len(market_latencies) < args.market_builder_ticks:
+            started = time.perf_counter()
+            builder.apply_snapshots(frame)
+            builder_elapsed += time.perf_counter() - started
+        market_latencies.append(elapsed)
+        del frame
+    applied = len(market_latencies)
+    compared = min(applied, args.market_builder_ticks)
+    return {
+        "symbols": len(market),
+        "ticks": applied,
+        "capacity": market.capacity,
+        "array_bytes": market.nbytes(),
+        "array_bytes_per_symbol": round(market.nbytes() / max(len(market), 1)),
+        "snapshots_per_sec": round(applied * len(market) / sum(market_latencies), 1),
+        "tick": _percentiles(market_latencies),
+        "builder_1m_1d_tick_ms": round(builder_elapsed / max(compared, 1) * 1000, 3),
+        "array_1m_1d_tick_ms": round(sum(market_latencies[:compared]) / max(compared, 1) * 1000, 3),
+    }
+
+
+async def bench_cache(args) -> dict:
+    cache = MemoryCache()
+    keys = [f"bench:{index}" for index in range(args.cache_keys)]
+    value = {"fresh_until": 0, "bars": [{"ts": index} for index in range(100)]}
+    started = time.perf_counter()
+    for key in keys:
+        cache.set(key, value, ttl_seconds=3600)
+    set_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    hits = sum(1 for key in keys if cache.get(key) is not None)
+    get_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    misses = sum(1 for key in keys if cache.get(key + ":missing") is None)
+    miss_elapsed = time.perf_counter() - started
+
+    settings = Settings()
+    provider = SyntheticProvider(SyntheticConfig(universe_size=args.symbols))
+    service = _history_service(provider, settings)
+    symbol = provider.symbols[0]
+    start_ms = int(datetime(2015, 1, 1, tzinfo=TZ).timestamp() * 1000)
+    end_ms = int(datetime.combine(date(2024, 3, 1), datetime.min.time(), tzinfo=TZ).timestamp() * 1000)
+    await service.get_page(symbol, "1d", start_ms, end_ms, limit=2000)
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await service.get_page(symbol, "1d", start_ms, end_ms, limit=2000)
+    page_elapsed = time.perf_counter() - started
+    return {
+        "memory_set_ops_per_sec": round(len(keys) / set_elapsed, 1),
+        "memory_hit_ops_per_sec": round(hits / get_elapsed, 1),
+        "memory_miss_ops_per_sec": round(misses / miss_elapsed, 1),
+        "history_hit_pages_per_sec": round(rounds / page_elapsed, 2),
+        "history_hit_page_ms": round(page_elapsed / rounds * 1000, 3),
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main_async(args) -> dict:
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    results: dict[str, dict] = {}
+    for name in selected:
+        if name == "history":
+            results[name] = await bench_history(args)
+        elif name == "fanout":
+            results[name] = await bench_fanout(args)
+        elif name == "builder":
+            results[name] = bench_builder(args)
+        elif name == "market":
+            results[name] = bench_market(args)
+        elif name == "cache":
+            results[name] = await bench_cache(args)
+        else:
+            raise SystemExit(f"unknown scenario: {name}")
+    return {
+        "benchmark": "gateway",
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "params": {
+            key: value for key, value in vars(args).items() if key not in {"output", "scenarios"}
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--symbols", type=int, default=5000, help="Synthetic market size")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated upstream latency")
+    parser.add_argument("--history-requests", type=int, default=300)
+    parser.add_argument("--history-symbols", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--fanout-symbols", type=int, default=200)
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--market-ticks", type=int, default=240, help="Minutes of one trading day")
+    parser.add_argument("--market-builder-ticks", type=int, default=20)
+    parser.add_argument("--market-memory-mb", type=int, default=96)
+    parser.add_argument("--cache-keys", type=int, default=50000)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
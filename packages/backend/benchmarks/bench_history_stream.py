@@ -0,0 +1,116 @@
+"""Streamed vs. paged history for long ranges.
+
+Runs ``HistoryService`` against the synthetic provider with a cold memory
+cache and encodes the output the way the endpoints do: ``paged`` builds one
+``HistoryResponse`` for the whole range (what ``/bars/history`` would do
+without its ``HISTORY_MAX_LIMIT`` and ``MINUTE_HISTORY_MAX_DAYS`` caps) and
+``stream`` writes the NDJSON lines of ``/bars/history/stream``. Reports time to the first encoded byte, total
+time (medians, in ms) and the ``tracemalloc`` peak, so that base and head
+runs diff with ``benchmarks/compare.py``.
+
+    python benchmarks/bench_history_stream.py --output base.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache  # noqa: E402
+from klinecharts_pro_akshare_gateway.config import Settings  # noqa: E402
+from klinecharts_pro_akshare_gateway.history import HistoryService  # noqa: E402
+from klinecharts_pro_akshare_gateway.models import (  # noqa: E402
+    HistoryResponse,
+    HistoryStreamChunk,
+)
+from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.synthetic import (  # noqa: E402
+    SyntheticConfig,
+    SyntheticProvider,
+)
+
+# ms ranges: 2004-01-01 .. 2024-03-01 and 2024-01-02 .. 2024-03-01 (Asia/Shanghai)
+RANGES = {
+    "1d_20y": ("1d", 1072886400000, 1709308799999),
+    "1m_2mo": ("1m", 1704159000000, 1709276400000),
+}
+
+
+async def _paged(service: HistoryService, symbol: str, period: str, start: int, end: int) -> tuple[float, int]:
+    page = await service.get_page(symbol, period, start, end, 10**7)
+    body = HistoryResponse(symbol=symbol, period=period, items=page.items).model_dump_json().encode()
+    return time.perf_counter(), len(body)
+
+
+async def _streamed(service: HistoryService, symbol: str, period: str, start: int, end: int) -> tuple[float, int]:
+    first = None
+    size = 0
+    async for bars, stale in service.stream(symbol, period, start, end, 10**7):
+        size += len(HistoryStreamChunk.model_construct(items=bars, stale=stale).model_dump_json()) + 1
+        if first is None:
+            first = time.perf_counter()
+    return first, size
+
+
+async def _run(mode, period: str, start: int, end: int, args) -> dict:
+    settings = Settings(minute_history_max_days=10_000) if mode is _paged else Settings()
+    provider = SyntheticProvider(SyntheticConfig(universe_size=1))
+    symbol = provider.symbols[0]
+    firsts, totals, peaks = [], [], []
+    for _ in range(args.repeats):
+        service = HistoryService(AsyncProvider(provider), MemoryCache(), settings)
+        tracemalloc.start()
+        started = time.perf_counter()
+        first, size = await mode(service, symbol, period, start, end)
+        totals.append(time.perf_counter() - started)
+        firsts.append(first - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "bytes": size,
+        "first_byte_ms": round(statistics.median(firsts) * 1e3, 2),
+        "total_ms": round(statistics.median(totals) * 1e3, 2),
+        "peak_kb": round(statistics.median(peaks) / 1024, 1),
+    }
+
+
+async def _main(args) -> dict:
+    scenarios = {}
+    for name, (period, start, end) in RANGES.items():
+        scenarios[name] = {
+            "paged": await _run(_paged, period, start, end, args),
+            "stream": await _run(_streamed, period, start, end, args),
+        }
+    return scenarios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    result = {
+        "benchmark": "history_stream",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": asyncio.run(_main(args)),
+    }
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Replay a recorded snapshot stream through the bar builder and WebSocket fan-out.
+
+Feeds ``ReplayProvider`` batches into ``Poller.publish`` at ``--speed`` times
+real time (0 = as fast as possible) with ``--subscribers`` in-process
+connections per symbol. Besides latency, the result carries a digest of every
+closed bar so builder behaviour can be compared across commits. Without
+``--recording`` a stream is first generated from the synthetic provider.
+
+    python benchmarks/bench_replay.py --recording snapshots.jsonl --speed 100
+    python benchmarks/bench_replay.py --frames 400 --symbols 300 --speed 0 --output replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder  # noqa: E402
+from klinecharts_pro_akshare_gateway.config import Settings  # noqa: E402
+from klinecharts_pro_akshare_gateway.poller import Poller  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.replay import (  # noqa: E402
+    ReplayProvider,
+    SnapshotRecorder,
+    read_recording,
+)
+from klinecharts_pro_akshare_gateway.provider.synthetic import (  # noqa: E402
+    SyntheticConfig,
+    SyntheticProvider,
+)
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock  # noqa: E402
+from klinecharts_pro_akshare_gateway.ws.hub import hub  # noqa: E402
+
+TZ = ZoneInfo("Asia/Shanghai")
+
+
+class _RecordingWebSocket:
+    def __init__(self, digest=None) -> None:
+        self.messages = 0
+        self._digest = digest
+
+    async def send_json(self, data) -> None:
+        payload = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        self.messages += 1
+        if self._digest is not None and data.get("bar", {}).get("is_closed"):
+            self._digest.update(payload.encode())
+
+
+def generate_recording(path: Path, frames: int, symbols: int) -> None:
+    provider = SyntheticProvider(
+        SyntheticConfig(
+            universe_size=symbols,
+            snapshot_start=datetime(2024, 3, 4, 9, 30, 1, tzinfo=TZ),
+            tick_seconds=3.0,
+        )
+    )
+    recorder = SnapshotRecorder(path)
+    try:
+        for _ in range(frames):
+            recorder.append(provider.get_realtime_snapshot_batch(provider.symbols))
+    finally:
+        recorder.close()
+
+
+async def replay(args, path: Path) -> dict:
+    settings = Settings()
+    first = next(read_recording(path), None)
+    if first is None:
+        raise SystemExit(f"empty recording: {path}")
+    symbols = sorted(first[1])[: args.symbols] if args.symbols else sorted(first[1])
+
+    provider = ReplayProvider(path, speed=args.speed, tz_name=settings.timezone)
+    async_provider = AsyncProvider(provider)
+    clock = TradingClock.from_settings(settings)
+    poller = Poller(async_provider, BarBuilder(clock), settings, clock=clock)
+
+    digest = hashlib.sha256()
+    sockets = [_RecordingWebSocket(digest)] + [
+        _RecordingWebSocket() for _ in range(args.subscribers - 1)
+    ]
+    for ws in sockets:
+        for symbol in symbols:
+            for period in args.periods.split(","):
+                hub.subscribe(ws, symbol, period)
+    latencies: list[float] = []
+    events = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            snapshots = await async_provider.get_realtime_snapshot_batch(symbols)
+            if provider.exhausted:
+                break
+            tick_started = time.perf_counter()
+            events += await poller.publish(snapshots)
+            latencies.append(time.perf_counter() - tick_started)
+    finally:
+        for ws in sockets:
+            hub.remove(ws)
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies) or [0.0]
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "benchmark": "replay",
+        "recording": str(path),
+        "speed": args.speed,
+        "frames": provider.frames_served,
+        "symbols": len(symbols),
+        "subscribers": len(sockets),
+        "periods": args.periods,
+        "events": events,
+        "elapsed_s": round(elapsed, 3),
+        "frames_per_sec": round(provider.frames_served / elapsed, 2),
+        "messages_per_sec": round(sum(ws.messages for ws in sockets) / elapsed, 1),
+        "publish": {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": pick(1.0)},
+        "closed_bars_sha256": digest.hexdigest(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", help="JSONL written by SNAPSHOT_RECORD_PATH")
+    parser.add_argument("--frames", type=int, default=300, help="Frames to generate without --recording")
+    parser.add_argument("--symbols", type=int, default=200, help="Symbols to subscribe (0 = all)")
+    parser.add_argument("--subscribers", type=int, default=5)
+    parser.add_argument("--periods", default="1m,5m,1d")
+    parser.add_argument("--speed", type=float, default=100.0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.recording:
+        result = asyncio.run(replay(args, Path(args.recording)))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "synthetic.jsonl"
+            generate_recording(path, args.frames, max(args.symbols, 1))
+            result = asyncio.run(replay(args, path))
+            result["recording"] = f"synthetic:{args.frames}x{max(args.symbols, 1)}"
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
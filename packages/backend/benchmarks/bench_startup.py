@@ -0,0 +1,86 @@
+"""Measure import cost per module for the gateway (and optionally akshare).
+
+Each run imports the target in a fresh interpreter with ``-X importtime``;
+the per-module numbers reported are medians across runs, in microseconds,
+and ``packages`` sums self time per top-level package.
+
+    python benchmarks/bench_startup.py --runs 5 --target klinecharts_pro_akshare_gateway.main
+    python benchmarks/bench_startup.py --target akshare --top 30 --output startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_once(target: str) -> dict[str, tuple[int, int, int]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: dict[str, tuple[int, int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, raw_name = line.split("|")
+        self_us = int(head.split(":")[1])
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        modules[raw_name.strip()] = (self_us, int(cumulative_us), depth)
+    return modules
+
+
+def summarize(runs: list[dict[str, tuple[int, int, int]]], top: int) -> dict:
+    names = set().union(*runs)
+    rows = []
+    for name in names:
+        samples = [run[name] for run in runs if name in run]
+        rows.append(
+            {
+                "module": name,
+                "self_us": int(statistics.median(s[0] for s in samples)),
+                "cumulative_us": int(statistics.median(s[1] for s in samples)),
+                "depth": min(s[2] for s in samples),
+            }
+        )
+    top_level = [row for row in rows if row["depth"] == 0]
+    packages: dict[str, int] = {}
+    for row in rows:
+        package = row["module"].split(".", 1)[0]
+        packages[package] = packages.get(package, 0) + row["self_us"]
+    rows.sort(key=lambda row: row["cumulative_us"], reverse=True)
+    return {
+        "total_us": sum(row["cumulative_us"] for row in top_level),
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+        "modules": rows[:top],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="klinecharts_pro_akshare_gateway.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    runs = [run_once(args.target) for _ in range(args.runs)]
+    result = {"benchmark": "startup_import", "target": args.target, "runs": args.runs}
+    result.update(summarize(runs, args.top))
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
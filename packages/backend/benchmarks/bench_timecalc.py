@@ -0,0 +1,110 @@
+"""Micro-benchmark of time arithmetic in the bar pipeline.
+
+Times one ``BarBuilder.apply_snapshots`` tick for all eight live periods and
+``aggregate_bars`` rolling one trading day of 1m bars up to 5m and 60m,
+both against the synthetic provider. Per-call times are medians across
+``--repeats`` runs, in microseconds, so base/head runs diff cleanly with
+``benchmarks/compare.py``.
+
+    python benchmarks/bench_timecalc.py --output base.json
+    python benchmarks/bench_timecalc.py --symbols 2000 --ticks 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from klinecharts_pro_akshare_gateway.barbuilder.buckets import (  # noqa: E402
+    SessionBuckets,
+    aggregate_bars,
+)
+from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder  # noqa: E402
+from klinecharts_pro_akshare_gateway.config import Settings  # noqa: E402
+from klinecharts_pro_akshare_gateway.provider.synthetic import (  # noqa: E402
+    SyntheticConfig,
+    SyntheticProvider,
+)
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock  # noqa: E402
+
+TZ = ZoneInfo("Asia/Shanghai")
+SESSION_OPEN = datetime(2024, 3, 4, 9, 30, tzinfo=TZ)
+
+
+def bench_builder_tick(args, clock: TradingClock) -> dict:
+    provider = SyntheticProvider(
+        SyntheticConfig(universe_size=args.symbols, snapshot_start=SESSION_OPEN, tick_seconds=3)
+    )
+    frames = [provider.get_realtime_snapshot_batch(provider.symbols) for _ in range(args.ticks)]
+    samples = []
+    events = 0
+    for _ in range(args.repeats):
+        builder = BarBuilder(clock)
+        started = time.perf_counter()
+        for frame in frames:
+            events = len(builder.apply_snapshots(frame))
+        samples.append((time.perf_counter() - started) / args.ticks)
+    tick = statistics.median(samples)
+    return {
+        "symbols": args.symbols,
+        "events_per_tick": events,
+        "tick_us": round(tick * 1e6, 1),
+        "per_symbol_us": round(tick / args.symbols * 1e6, 3),
+    }
+
+
+def bench_aggregate(args, clock: TradingClock) -> dict:
+    provider = SyntheticProvider(SyntheticConfig(universe_size=1))
+    start = SESSION_OPEN.replace(hour=0, minute=0)
+    bars = provider.get_minute_history(provider.symbols[0], "1m", start, start + timedelta(days=1))
+    buckets = SessionBuckets(clock)
+    results: dict[str, float | int] = {"bars_per_day": len(bars)}
+    for period in ("5m", "60m"):
+        samples = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            for _ in range(args.days):
+                aggregate_bars(bars, period, buckets)
+            samples.append((time.perf_counter() - started) / args.days)
+        results[f"day_to_{period}_us"] = round(statistics.median(samples) * 1e6, 1)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--days", type=int, default=200, help="Aggregations per sample")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    settings = Settings()
+    clock = TradingClock.from_settings(settings)
+    result = {
+        "benchmark": "timecalc",
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": {
+            "builder_tick": bench_builder_tick(args, clock),
+            "aggregate": bench_aggregate(args, clock),
+        },
+    }
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
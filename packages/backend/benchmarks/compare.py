@@ -0,0 +1,94 @@
+"""Compare two benchmark JSON files and flag regressions.
+
+Numeric leaves are matched by path. List entries are matched by their
+``name``/``module`` field, since positions shift when an entry is added or
+removed; lists without such a key are skipped. Keys ending in ``_ms`` or
+``_us`` are lower-is-better, ``*_per_sec`` keys are higher-is-better and
+other numbers are shown without a verdict. Exits non-zero when any directional metric regresses by more than
+``--threshold`` percent.
+
+    python benchmarks/compare.py base.json head.json --threshold 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_SKIP = {"params", "revision", "python", "cpu_count", "benchmark"}
+_LIST_KEYS = ("name", "module")
+
+
+def flatten(node, prefix: str = "") -> dict[str, float]:
+    out: dict[str, float] = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if not prefix and key in _SKIP:
+                continue
+            out.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(node, list):
+        for value in node:
+            key = _list_key(value)
+            if key is not None:
+                out.update(flatten(value, f"{prefix}[{key}]"))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        out[prefix] = float(node)
+    return out
+
+
+def _list_key(value) -> str | None:
+    if isinstance(value, dict):
+        for field in _LIST_KEYS:
+            if isinstance(value.get(field), str):
+                return value[field]
+    return None
+
+
+def direction(path: str) -> int:
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf.endswith("_ms") or leaf.endswith("_us"):
+        return -1
+    if leaf.endswith("_per_sec"):
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    base_doc = json.loads(Path(args.base).read_text())
+    head_doc = json.loads(Path(args.head).read_text())
+    base = flatten(base_doc)
+    head = flatten(head_doc)
+    print(f"base {base_doc.get('revision')}  head {head_doc.get('revision')}")
+    if base_doc.get("params") != head_doc.get("params"):
+        print("warning: runs used different parameters")
+    regressions = 0
+    width = max((len(path) for path in base.keys() & head.keys()), default=10)
+    for path in sorted(base.keys() & head.keys()):
+        old, new = base[path], head[path]
+        change = (new - old) / old * 100 if old else 0.0
+        sign = direction(path)
+        verdict = ""
+        if sign and abs(change) >= args.threshold:
+            if change * sign < 0:
+                verdict = "REGRESSION"
+                regressions += 1
+            else:
+                verdict = "improved"
+        print(f"{path:<{width}}  {old:>14.3f}  {new:>14.3f}  {change:>+8.1f}%  {verdict}")
+    for path in sorted(base.keys() - head.keys()):
+        print(f"{path:<{width}}  only in base")
+    for path in sorted(head.keys() - base.keys()):
+        print(f"{path:<{width}}  only in head")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
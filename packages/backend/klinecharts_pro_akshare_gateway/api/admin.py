@@ -0,0 +1,59 @@
+import secrets
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from klinecharts_pro_akshare_gateway.profiling import profiler
+
+router = APIRouter()
+
+
+class ProfilingUpdate(BaseModel):
+    enabled: bool | None = None
+    sample_rate: float | None = None
+    max_traces: int | None = None
+    cprofile: bool | None = None
+    clear: bool = False
+
+
+def require_admin(request: Request, x_admin_token: str | None = Header(None)) -> None:
+    token = request.app.state.settings.admin_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="forbidden")
+
+
+@router.get("/profiling", dependencies=[Depends(require_admin)])
+async def get_profiling():
+    return {**profiler.status(), "phases": profiler.summary()}
+
+
+@router.post("/profiling", dependencies=[Depends(require_admin)])
+async def update_profiling(body: ProfilingUpdate):
+    if body.clear:
+        profiler.clear()
+    profiler.configure(enabled=body.enabled, sample_rate=body.sample_rate, max_traces=body.max_traces)
+    if body.cprofile:
+        profiler.start_cprofile()
+    return profiler.status()
+
+
+@router.get("/profiling/speedscope", dependencies=[Depends(require_admin)])
+async def get_speedscope():
+    return profiler.speedscope()
+
+
+@router.post("/profiling/pstats", dependencies=[Depends(require_admin)])
+async def dump_pstats():
+    data = profiler.stop_cprofile()
+    if data is None:
+        raise HTTPException(status_code=409, detail="cprofile not running")
+    filename = time.strftime("gateway-%Y%m%d-%H%M%S.prof")
+    return Response(
+        data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,15 +1,46 @@
-from datetime import date, datetime, timedelta, timezone
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Literal
 from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from klinecharts_pro_akshare_gateway.encoding import encode_columnar, wants_columnar
+from klinecharts_pro_akshare_gateway.history import (
+    DAILY_PERIODS,
+    Cursor,
+    HistoryService,
+    InvalidCursorError,
+)
+from klinecharts_pro_akshare_gateway.indicators.kernels import IndicatorSpec, InvalidIndicatorError
+from klinecharts_pro_akshare_gateway.metrics import HISTORY_RESPONSE_BARS
+from klinecharts_pro_akshare_gateway.models import (
+    BatchHistoryItem,
+    BatchHistoryRequest,
+    BatchHistoryResult,
+    ColumnarHistoryResponse,
+    HistoryResponse,
+    HistoryStreamChunk,
+    HistoryStreamEnd,
+)
+from klinecharts_pro_akshare_gateway.profiling import phase
+from klinecharts_pro_akshare_gateway.provider.async_provider import ProviderBusyError
+from klinecharts_pro_akshare_gateway.provider.circuit import CircuitOpenError
+
+if TYPE_CHECKING:
+    from klinecharts_pro_akshare_gateway.indicators.engine import IndicatorEngine
 
-from klinecharts_pro_akshare_gateway.models import HistoryResponse
-from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/history", response_model=HistoryResponse)
+@router.get("/history", response_model=HistoryResponse | ColumnarHistoryResponse)
 async def get_history(
     request: Request,
     symbol: str = Query(...),
@@ -17,61 +48,266 @@ async def get_history(
     from_: str = Query(..., alias="from"),
     to: str = Query(...),
     limit: int = Query(2000, ge=1, le=2000),
+    format: str | None = Query(None, pattern="^(json|columnar)$"),
+    cursor: str | None = Query(None),
+    direction: Literal["forward", "backward"] = Query("forward"),
+    indicators: str | None = Query(None),
+):
+    settings = request.app.state.settings
+    columnar = wants_columnar(format, request.headers.get("accept"))
+    specs = _parse_indicators(request.app.state.indicator_engine, indicators)
+    response = await _resolve_history(
+        request.app.state.history_service,
+        settings,
+        symbol,
+        period,
+        from_,
+        to,
+        limit,
+        direction,
+        cursor,
+    )
+    await _attach_indicators(request.app.state.indicator_engine, response, specs)
+    return _render(response, columnar, settings)
+
+
+@router.get("/history/stream")
+async def stream_history(
+    request: Request,
+    symbol: str = Query(...),
+    period: str = Query(...),
+    from_: str = Query(..., alias="from"),
+    to: str = Query(...),
+    limit: int | None = Query(None, ge=1),
+):
+    settings = request.app.state.settings
+    service: HistoryService = request.app.state.history_service
+    max_bars = max(settings.history_max_limit, settings.history_stream_max_bars)
+    limit = min(limit or settings.history_max_limit, max_bars)
+    start_ms, end_ms = _parse_range(settings, period, from_, to)
+    chunks = service.stream(symbol, period, start_ms, end_ms, limit)
+    # The first chunk is awaited before the response starts so that an
+    # unavailable upstream still maps to a status code.
+    with _history_errors():
+        first = await anext(chunks, None)
+
+    async def body():
+        count = 0
+        next_from = None
+        error = None
+        chunk = first
+        try:
+            while chunk is not None:
+                bars, stale = chunk
+                count += len(bars)
+                next_from = bars[-1].ts + 1
+                line = HistoryStreamChunk.model_construct(items=bars, stale=stale).model_dump_json()
+                yield line.encode() + b"\n"
+                with _history_errors():
+                    chunk = await anext(chunks, None)
+        except HTTPException as exc:
+            error = str(exc.detail)
+        except Exception:
+            logger.exception("history stream failed")
+            error = "history failed"
+        finally:
+            await chunks.aclose()
+        HISTORY_RESPONSE_BARS.observe(count, "ndjson")
+        end = HistoryStreamEnd(count=count, next_from=next_from, error=error)
+        yield end.model_dump_json().encode() + b"\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.get("/live", response_model=HistoryResponse | ColumnarHistoryResponse)
+async def get_live_bars(
+    request: Request,
+    symbol: str = Query(...),
+    period: Literal["1m", "1d"] = Query("1m"),
+    format: str | None = Query(None, pattern="^(json|columnar)$"),
 ):
+    market = request.app.state.bar_builder.market
+    if market is None:
+        raise HTTPException(status_code=404, detail="market bars disabled")
     settings = request.app.state.settings
+    columnar = wants_columnar(format, request.headers.get("accept"))
+    response = HistoryResponse(symbol=symbol, period=period, items=market.bars(symbol, period))
+    return _render(response, columnar, settings)
+
+
+@router.post("/history/batch")
+async def get_history_batch(request: Request, body: BatchHistoryRequest):
+    settings = request.app.state.settings
+    if len(body.items) > settings.history_batch_max_items:
+        raise HTTPException(status_code=400, detail="too many items")
+    columnar = wants_columnar(body.format, request.headers.get("accept"))
+    service: HistoryService = request.app.state.history_service
+    limiter = asyncio.Semaphore(settings.history_batch_concurrency)
+
+    engine: IndicatorEngine | None = request.app.state.indicator_engine
+
+    async def resolve(index: int, item: BatchHistoryItem) -> BatchHistoryResult:
+        try:
+            specs = _parse_indicators(engine, item.indicators)
+            response = await _resolve_history(
+                service,
+                settings,
+                item.symbol,
+                item.period,
+                item.from_,
+                item.to,
+                item.limit,
+                item.direction,
+                item.cursor,
+                limiter=limiter,
+            )
+            await _attach_indicators(engine, response, specs)
+        except HTTPException as exc:
+            return BatchHistoryResult(index=index, error=str(exc.detail))
+        except Exception:
+            logger.exception("batch history item failed")
+            return BatchHistoryResult(index=index, error="history failed")
+        return BatchHistoryResult(index=index, result=_render(response, columnar, settings))
+
+    async def stream():
+        tasks = [asyncio.create_task(resolve(i, item)) for i, item in enumerate(body.items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield result.model_dump_json().encode() + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def _resolve_history(
+    service: HistoryService,
+    settings,
+    symbol: str,
+    period: str,
+    from_: str,
+    to: str,
+    limit: int,
+    direction: str,
+    cursor: str | None,
+    limiter: asyncio.Semaphore | None = None,
+) -> HistoryResponse:
     if limit > settings.history_max_limit:
         limit = settings.history_max_limit
 
-    cache: MemoryCache = request.app.state.history_cache
-    cache_key = f"history:{symbol}:{period}:{from_}:{to}:{limit}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return HistoryResponse.model_validate(cached)
+    start_ms, end_ms = _parse_range(settings, period, from_, to)
 
-    provider = request.app.state.async_provider
-    if _is_daily_period(period):
-        start = _parse_date(from_)
-        end = _parse_date(to)
-        items = await provider.get_daily_history(symbol, start, end)
-        if period in {"1w", "1M"}:
-            items = _aggregate_bars(items, period, settings.timezone)
-    elif _is_minute_period(period):
-        start_dt = _parse_datetime(from_, settings.timezone)
-        end_dt = _parse_datetime(to, settings.timezone)
-        if end_dt < start_dt:
-            raise HTTPException(status_code=400, detail="invalid range")
-        max_days = settings.minute_history_max_days
-        if end_dt - start_dt > timedelta(days=max_days):
-            start_dt = end_dt - timedelta(days=max_days)
+    anchor_ms = None
+    if cursor is not None:
         try:
-            items = await provider.get_minute_history(symbol, period, start_dt, end_dt)
-        except NotImplementedError as exc:
-            raise HTTPException(status_code=501, detail="minute history not implemented") from exc
-        if not items:
-            items = await _fallback_recent_minute_history(provider, symbol, period, end_dt, settings)
-    else:
-        raise HTTPException(status_code=400, detail="unsupported period")
+            decoded = Cursor.decode(cursor)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail="invalid cursor") from exc
+        if decoded.period != period:
+            raise HTTPException(status_code=400, detail="cursor period mismatch")
+        direction = decoded.direction
+        anchor_ms = decoded.ts
+
+    with _history_errors():
+        page = await service.get_page(
+            symbol,
+            period,
+            start_ms,
+            end_ms,
+            limit,
+            direction=direction,
+            anchor_ms=anchor_ms,
+            limiter=limiter,
+        )
+    items = page.items
 
-    items = items[:limit]
     next_from = None
     if items:
         next_from = items[-1].ts + 1
 
-    response = HistoryResponse(symbol=symbol, period=period, items=items, next_from=next_from)
-    ttl = 6 * 60 * 60 if _is_daily_period(period) else 10 * 60
-    cache.set(cache_key, response.model_dump(), ttl_seconds=ttl)
+    return HistoryResponse(
+        symbol=symbol,
+        period=period,
+        items=items,
+        next_from=next_from,
+        older_cursor=page.older.encode() if page.older else None,
+        newer_cursor=page.newer.encode() if page.newer else None,
+        stale=page.stale,
+    )
+
+
+def _parse_range(settings, period: str, from_: str, to: str) -> tuple[int, int]:
+    tz_name = settings.timezone
+    if _is_daily_period(period):
+        start_ms = _date_start_ms(_parse_date(from_, tz_name), tz_name)
+        end_ms = _date_start_ms(_parse_date(to, tz_name) + timedelta(days=1), tz_name) - 1
+    elif _is_minute_period(period):
+        start_ms = _to_ms(_parse_datetime(from_, tz_name))
+        end_ms = _to_ms(_parse_datetime(to, tz_name))
+    else:
+        raise HTTPException(status_code=400, detail="unsupported period")
+    if end_ms < start_ms:
+        raise HTTPException(status_code=400, detail="invalid range")
+    return start_ms, end_ms
+
+
+@contextmanager
+def _history_errors():
+    try:
+        yield
+    except NotImplementedError as exc:
+        raise HTTPException(status_code=501, detail="minute history not implemented") from exc
+    except ProviderBusyError as exc:
+        raise HTTPException(status_code=503, detail="provider busy") from exc
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="upstream unavailable",
+            headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+        ) from exc
+
+
+def _parse_indicators(engine: IndicatorEngine | None, value: str | None) -> list[IndicatorSpec]:
+    if not value:
+        return []
+    if engine is None:
+        raise HTTPException(status_code=400, detail="indicators disabled")
+    try:
+        return [IndicatorSpec.parse(item) for item in value.split(";") if item.strip()]
+    except InvalidIndicatorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+async def _attach_indicators(
+    engine: IndicatorEngine | None, response: HistoryResponse, specs: list[IndicatorSpec]
+) -> None:
+    if engine is None or not specs:
+        return
+    with phase("indicators"):
+        response.indicators = await engine.series(response.symbol, response.period, specs, response.items)
+
+
+def _render(response: HistoryResponse, columnar: bool, settings):
+    HISTORY_RESPONSE_BARS.observe(len(response.items), "columnar" if columnar else "json")
+    if columnar:
+        with phase("encode"):
+            return encode_columnar(response, settings.columnar_price_decimals)
     return response
 
 
 def _is_daily_period(period: str) -> bool:
-    return period in {"1d", "1w", "1M"}
+    return period in DAILY_PERIODS
 
 
 def _is_minute_period(period: str) -> bool:
-    return period.endswith("m")
+    return period.endswith("m") and period[:-1].isdigit() and int(period[:-1]) > 0
 
 
-def _parse_date(value: str) -> date:
+def _parse_date(value: str, tz_name: str) -> date:
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, tz=ZoneInfo(tz_name)).date()
     try:
         return datetime.strptime(value, "%Y-%m-%d").date()
     except ValueError as exc:
@@ -91,63 +327,9 @@ def _parse_datetime(value: str, tz_name: str) -> datetime:
         raise HTTPException(status_code=400, detail="invalid datetime format") from exc
 
 
-async def _fallback_recent_minute_history(provider, symbol, period, end_dt, settings):
-    try:
-        calendar = await provider.get_trading_calendar()
-    except Exception:
-        return []
-    if not calendar:
-        return []
-    tz = ZoneInfo(settings.timezone)
-    target_date = end_dt.astimezone(tz).date()
-    candidates = sorted([d for d in calendar if d <= target_date.isoformat()])
-    if not candidates:
-        return []
-    last_date = datetime.fromisoformat(candidates[-1]).date()
-    start_dt = datetime.combine(last_date, datetime.min.time(), tzinfo=tz).replace(
-        hour=9, minute=30
-    )
-    end_dt = datetime.combine(last_date, datetime.min.time(), tzinfo=tz).replace(hour=15, minute=0)
-    try:
-        return await provider.get_minute_history(symbol, period, start_dt, end_dt)
-    except Exception:
-        return []
+def _date_start_ms(value: date, tz_name: str) -> int:
+    return _to_ms(datetime.combine(value, time.min, tzinfo=ZoneInfo(tz_name)))
 
 
-def _aggregate_bars(items, period: str, tz_name: str):
-    tz = ZoneInfo(tz_name)
-    buckets: dict[str, list] = {}
-    for bar in items:
-        dt = datetime.fromtimestamp(bar.ts / 1000, tz=timezone.utc).astimezone(tz)
-        if period == "1w":
-            start = dt.date() - timedelta(days=dt.weekday())
-        else:
-            start = dt.date().replace(day=1)
-        key = start.isoformat()
-        buckets.setdefault(key, []).append((start, bar))
-
-    aggregated = []
-    for key in sorted(buckets.keys()):
-        bars = buckets[key]
-        bars.sort(key=lambda item: item[1].ts)
-        _, first = bars[0]
-        _, last = bars[-1]
-        high = max(item[1].high for item in bars)
-        low = min(item[1].low for item in bars)
-        volume = sum(item[1].volume for item in bars)
-        amount = sum((item[1].amount or 0.0) for item in bars)
-        start_date = bars[0][0]
-        bucket_start = datetime.combine(start_date, datetime.min.time(), tzinfo=tz)
-        aggregated.append(
-            type(first)(
-                ts=int(bucket_start.astimezone(timezone.utc).timestamp() * 1000),
-                open=first.open,
-                high=high,
-                low=low,
-                close=last.close,
-                volume=volume,
-                amount=amount,
-                is_closed=True,
-            )
-        )
-    return aggregated
+def _to_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 
 
 router = APIRouter()
@@ -10,11 +11,24 @@ router = APIRouter()
 async def health(request: Request):
     settings = request.app.state.settings
     poller = request.app.state.poller
+    market = request.app.state.bar_builder.market
     return {
         "status": "ok",
         "time": datetime.now(timezone.utc).isoformat(),
         "cache_backend": settings.cache_backend,
         "timezone": settings.timezone,
-        "trading_calendar_size": len(request.app.state.poller._clock._calendar or []),
+        "trading_calendar_size": request.app.state.trading_clock.calendar_size,
         "poller_running": poller is not None,
+        "market_bars": market.stats() if market is not None else None,
+        "provider_pools": request.app.state.async_provider.stats(),
+        "circuits": request.app.state.provider.stats(),
+        "ready": request.app.state.ready,
+        "startup_timings": request.app.state.startup_timings,
     }
+
+
+@router.get("/ready")
+async def ready(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
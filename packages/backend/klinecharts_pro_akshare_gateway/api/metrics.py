@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from klinecharts_pro_akshare_gateway.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from klinecharts_pro_akshare_gateway.api import bars, health, symbols
+from klinecharts_pro_akshare_gateway.api import admin, bars, health, metrics, symbols
 
 router = APIRouter()
 router.include_router(symbols.router, prefix="/symbols", tags=["symbols"])
 router.include_router(bars.router, prefix="/bars", tags=["bars"])
 router.include_router(health.router, tags=["health"])
+router.include_router(metrics.router, tags=["metrics"])
+router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 
 from klinecharts_pro_akshare_gateway.models import SymbolSearchResponse
+from klinecharts_pro_akshare_gateway.provider.async_provider import ProviderBusyError
 
 router = APIRouter()
 
@@ -14,5 +15,8 @@ async def search_symbols(
     if not q:
         return SymbolSearchResponse(items=[])
     provider = request.app.state.async_provider
-    items = await provider.search_symbols(q, limit)
+    try:
+        items = await provider.search_symbols(q, limit)
+    except ProviderBusyError as exc:
+        raise HTTPException(status_code=503, detail="provider busy") from exc
     return SymbolSearchResponse(items=items)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from klinecharts_pro_akshare_gateway.models import Bar
+from klinecharts_pro_akshare_gateway.trading_calendar import (
+    DAY_MS,
+    EPOCH_ORDINAL,
+    MINUTE_MS,
+    TradingClock,
+    epoch_ms,
+)
+
+_MINUTES_PER_DAY = 24 * 60
+_CACHED_DAYS = 8
+
+
+class SessionBuckets:
+    """Session-aligned bucket lookup shared by live bars and history.
+
+    For each trading day and intraday period a table maps minute-of-day to
+    the minute its bucket starts at, or -1 outside the day's sessions.
+    Buckets restart at every session open, so 60m bars are 09:30/10:30 and
+    13:00/14:00 rather than straddling the lunch break; the closing minute
+    of a session (11:30, 15:00) belongs to the session's last bucket.
+
+    Lookups take and return epoch milliseconds. With a fixed-offset market
+    zone (Asia/Shanghai) local time is one integer addition away, so no
+    datetimes are built; zones with DST fall back to ``zoneinfo`` per call.
+    """
+
+    def __init__(self, clock: TradingClock) -> None:
+        self._clock = clock
+        self._offset_ms = clock.utc_offset_ms
+        self._tables: dict[tuple[int, int], list[int]] = {}
+
+    @property
+    def tz(self):
+        return self._clock.tz
+
+    def local_day(self, ts_ms: int) -> int:
+        """Local calendar day of ``ts_ms`` as days since 1970-01-01."""
+        return self._to_local(ts_ms) // DAY_MS
+
+    def day_open(self, ts_ms: int) -> int | None:
+        """Epoch ms of the first session open on the local day of ``ts_ms``."""
+        day = self.local_day(ts_ms)
+        sessions = self._clock.sessions_for(date.fromordinal(day + EPOCH_ORDINAL))
+        if not sessions:
+            return None
+        return self._to_utc(day * DAY_MS + sessions[0][0] * 1000)
+
+    def in_session(self, ts_ms: int) -> bool:
+        day, ms_of_day = divmod(self._to_local(ts_ms), DAY_MS)
+        return self._table(day, 1)[ms_of_day // MINUTE_MS] >= 0
+
+    def bucket_start(self, ts_ms: int, period: str) -> int | None:
+        day, ms_of_day = divmod(self._to_local(ts_ms), DAY_MS)
+        if period.endswith("m"):
+            start = self._table(day, int(period[:-1]))[ms_of_day // MINUTE_MS]
+            if start < 0:
+                return None
+            return self._to_utc(day * DAY_MS + start * MINUTE_MS)
+        if period == "1w":
+            # 1970-01-01 was a Thursday.
+            day -= (day + 3) % 7
+        elif period == "1M":
+            day -= date.fromordinal(day + EPOCH_ORDINAL).day - 1
+        elif period != "1d":
+            return None
+        return self._to_utc(day * DAY_MS)
+
+    def bucket_starts(self, day: date, minutes: int) -> list[int]:
+        """Start minute-of-day of every bucket in the day's sessions."""
+        return sorted({start for start in self._table(day.toordinal() - EPOCH_ORDINAL, minutes) if start >= 0})
+
+    def _to_local(self, ts_ms: int) -> int:
+        if self._offset_ms is not None:
+            return ts_ms + self._offset_ms
+        dt = datetime.fromtimestamp(ts_ms / 1000, tz=self._clock.tz)
+        return ts_ms + dt.utcoffset() // timedelta(milliseconds=1)
+
+    def _to_utc(self, local_ms: int) -> int:
+        if self._offset_ms is not None:
+            return local_ms - self._offset_ms
+        wall = datetime.fromtimestamp(local_ms / 1000, tz=timezone.utc)
+        return epoch_ms(wall.replace(tzinfo=self._clock.tz))
+
+    def _table(self, day: int, minutes: int) -> list[int]:
+        key = (day, minutes)
+        table = self._tables.get(key)
+        if table is None:
+            if len(self._tables) >= _CACHED_DAYS * 8:
+                self._tables.clear()
+            table = _build_table(self._clock.sessions_for(date.fromordinal(day + EPOCH_ORDINAL)), minutes)
+            self._tables[key] = table
+        return table
+
+
+def aggregate_bars(items: list[Bar], period: str, buckets: SessionBuckets) -> list[Bar]:
+    """Rolls bars up into ``period`` buckets; bars outside sessions are dropped
+    for intraday periods."""
+    grouped: dict[int, list[Bar]] = {}
+    for bar in items:
+        start = buckets.bucket_start(bar.ts, period)
+        if start is None:
+            continue
+        grouped.setdefault(start, []).append(bar)
+
+    aggregated = []
+    for start in sorted(grouped):
+        bars = sorted(grouped[start], key=lambda bar: bar.ts)
+        first, last = bars[0], bars[-1]
+        aggregated.append(
+            Bar(
+                ts=start,
+                open=first.open,
+                high=max(bar.high for bar in bars),
+                low=min(bar.low for bar in bars),
+                close=last.close,
+                volume=sum(bar.volume for bar in bars),
+                amount=sum((bar.amount or 0.0) for bar in bars),
+                is_closed=True,
+            )
+        )
+    return aggregated
+
+
+def _build_table(sessions: list[tuple[int, int]], minutes: int) -> list[int]:
+    table = [-1] * _MINUTES_PER_DAY
+    for start_s, end_s in sessions:
+        start, end = start_s // 60, min(end_s // 60, _MINUTES_PER_DAY - 1)
+        for minute in range(start, end):
+            table[minute] = start + (minute - start) // minutes * minutes
+        if end > start:
+            table[end] = table[end - 1]
+    return table
@@ -1,33 +1,90 @@
 from __future__ import annotations
 
-from datetime import datetime, time, timedelta, timezone
-from zoneinfo import ZoneInfo
-
+from klinecharts_pro_akshare_gateway.barbuilder.buckets import SessionBuckets
+from klinecharts_pro_akshare_gateway.barbuilder.market import MarketBars
 from klinecharts_pro_akshare_gateway.barbuilder.models import BarState, SymbolState
 from klinecharts_pro_akshare_gateway.models import Bar, Snapshot
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock, epoch_ms
 
 
 class BarBuilder:
-    def __init__(self, tz_name: str = "Asia/Shanghai", periods: list[str] | None = None) -> None:
+    def __init__(
+        self,
+        clock: TradingClock,
+        periods: list[str] | None = None,
+        market: MarketBars | None = None,
+    ) -> None:
+        self.market = market
         self._states: dict[tuple[str, str], SymbolState] = {}
-        self._tz = ZoneInfo(tz_name)
+        # (symbol, ts) of 1m bars whose volume/amount started from a day total.
+        self._partial: set[tuple[str, int]] = set()
+        self._buckets = SessionBuckets(clock)
         self._periods = periods or ["1m", "5m", "15m", "30m", "60m", "1d", "1w", "1M"]
 
-    def apply_snapshots(self, snapshots: dict[str, Snapshot]) -> list[tuple[str, str, Bar]]:
+    def apply_snapshots(
+        self, snapshots: dict[str, Snapshot], active: set[str] | None = None
+    ) -> list[tuple[str, str, Bar]]:
+        """Builds bar events for ``active`` symbols (all when None); with a
+        market store attached every snapshot also updates its 1m/1d bars."""
+        if self.market is not None:
+            self.market.apply(snapshots)
         events: list[tuple[str, str, Bar]] = []
+        batch_ts = None
+        starts: list[tuple[str, int]] = []
+        trade_day = 0
         for symbol, snap in snapshots.items():
-            for period in self._periods:
-                events.extend(self._apply_snapshot(symbol, period, snap))
+            if active is not None and symbol not in active:
+                continue
+            if snap.ts != batch_ts:
+                # AKShare batches share one timestamp, so buckets resolve once per tick.
+                batch_ts = snap.ts
+                ts_ms = epoch_ms(snap.ts)
+                trade_day = self._buckets.local_day(ts_ms)
+                starts = self._bucket_starts(ts_ms)
+            for period, bucket_start in starts:
+                events.extend(self._apply_snapshot(symbol, period, snap, bucket_start, trade_day))
         return events
 
-    def _apply_snapshot(self, symbol: str, period: str, snap: Snapshot) -> list[tuple[str, str, Bar]]:
-        state = self._states.setdefault((symbol, period), SymbolState())
-        snap_ts = snap.ts.astimezone(self._tz)
-        trade_date = snap_ts.date().isoformat()
+    def pop_partial(self, symbol: str, ts: int) -> bool:
+        """True when the 1m bar at ``ts`` was opened from a fresh state after
+        the session's first minute (a restart or a late first subscribe): its
+        volume and amount then hold the day's totals so far rather than the
+        minute's. The mark is cleared."""
+        try:
+            self._partial.remove((symbol, ts))
+        except KeyError:
+            return False
+        return True
+
+    def close_intraday(self) -> list[tuple[str, str, Bar]]:
+        """Closes forming intraday bars once a session has ended. Daily and
+        longer bars stay open and cumulative totals carry into the next
+        session of the day."""
+        if self.market is not None:
+            self.market.close_minutes()
+        events: list[tuple[str, str, Bar]] = []
+        for (symbol, period), state in self._states.items():
+            if state.cur_bar is None or not period.endswith("m"):
+                continue
+            state.cur_bar.is_closed = True
+            events.append((symbol, period, _to_bar(state.cur_bar)))
+            state.cur_bar = None
+        return events
 
-        bucket_start = _bucket_start(snap_ts, period, self._tz)
-        if bucket_start is None:
+    def _bucket_starts(self, ts_ms: int) -> list[tuple[str, int]]:
+        if not self._buckets.in_session(ts_ms):
             return []
+        starts = []
+        for period in self._periods:
+            start = self._buckets.bucket_start(ts_ms, period)
+            if start is not None:
+                starts.append((period, start))
+        return starts
+
+    def _apply_snapshot(
+        self, symbol: str, period: str, snap: Snapshot, bucket_start: int, trade_date: int
+    ) -> list[tuple[str, str, Bar]]:
+        state = self._states.setdefault((symbol, period), SymbolState())
 
         events: list[tuple[str, str, Bar]] = []
         if state.last_trade_date is None:
@@ -56,6 +113,13 @@ class BarBuilder:
             )
 
         cur = state.cur_bar
+        if (
+            period == "1m"
+            and state.prev_volume_total is None
+            and snap.volume_total is not None
+            and bucket_start != self._buckets.day_open(bucket_start)
+        ):
+            self._partial.add((symbol, bucket_start))
         cur.high = max(cur.high, snap.last)
         cur.low = min(cur.low, snap.last)
         cur.close = snap.last
@@ -86,9 +150,8 @@ def _apply_totals(cur: BarState, state: SymbolState, snap: Snapshot, reset_add:
 
 
 def _to_bar(state: BarState) -> Bar:
-    ts = int(state.bucket_start.astimezone(timezone.utc).timestamp() * 1000)
     return Bar(
-        ts=ts,
+        ts=state.bucket_start,
         open=state.open,
         high=state.high,
         low=state.low,
@@ -99,27 +162,5 @@ def _to_bar(state: BarState) -> Bar:
     )
 
 
-def _bucket_start(ts: datetime, period: str, tz: ZoneInfo) -> datetime | None:
-    if period.endswith("m"):
-        minutes = int(period[:-1])
-        total_minutes = ts.hour * 60 + ts.minute
-        bucket_minutes = total_minutes - (total_minutes % minutes)
-        return ts.replace(
-            hour=bucket_minutes // 60,
-            minute=bucket_minutes % 60,
-            second=0,
-            microsecond=0,
-        )
-    if period == "1d":
-        return datetime.combine(ts.date(), time.min, tzinfo=tz)
-    if period == "1w":
-        start = ts.date() - timedelta(days=ts.weekday())
-        return datetime.combine(start, time.min, tzinfo=tz)
-    if period == "1M":
-        start = ts.date().replace(day=1)
-        return datetime.combine(start, time.min, tzinfo=tz)
-    return None
-
-
 def _reset_add_for_period(period: str) -> bool:
     return period in {"1w", "1M"}
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import logging
+import math
+from array import array
+from datetime import datetime
+from typing import Iterator
+
+from klinecharts_pro_akshare_gateway.barbuilder.buckets import SessionBuckets
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock, epoch_ms
+
+logger = logging.getLogger(__name__)
+
+MARKET_PERIODS = ("1m", "1d")
+
+# Row layout shared by current and closed bars: ts, open, high, low, close, volume, amount.
+_FIELDS = 7
+_ROW_BYTES = _FIELDS * 8
+# Per-slot bookkeeping beyond bar rows: totals, day number, partial minute, closed-array header.
+_SLOT_OVERHEAD_BYTES = 4 * 8 + 64
+_EMPTY_ROW = (math.nan,) * _FIELDS
+
+
+class MarketBars:
+    """Live 1m and 1d bars for every symbol in the snapshot payload.
+
+    Each symbol gets a slot on first sight. The current bar of slot ``i``
+    lives at ``[i * 7, i * 7 + 7)`` of one flat ``array('d')`` per period,
+    and the day's closed 1m bars are appended to a per-slot array with the
+    same row layout, so 5,000 symbols cost a few thousand Python objects
+    rather than one per bar. Volume and amount follow the bar builder's
+    cumulative-total rules. Slots are only handed out while a full trading
+    day of minutes for every slot fits in ``memory_budget_bytes``. With
+    ``track_closed`` set, ``pop_closed`` hands out each minute as it closes.
+    """
+
+    def __init__(self, clock: TradingClock, memory_budget_bytes: int) -> None:
+        self._buckets = SessionBuckets(clock)
+        session_minutes = sum(end - start for start, end in clock.sessions_for(clock.now().date())) // 60
+        self.slot_bytes = (len(MARKET_PERIODS) + session_minutes) * _ROW_BYTES + _SLOT_OVERHEAD_BYTES
+        self.capacity = max(0, memory_budget_bytes // self.slot_bytes)
+        self._slots: dict[str, int] = {}
+        self._symbols: list[str] = []
+        self._minute = array("d")
+        self._daily = array("d")
+        self._closed: list[array] = []
+        self._prev_volume = array("d")
+        self._prev_amount = array("d")
+        self._day = array("l")
+        # Per slot, the ts of a minute opened from a day total (see BarBuilder.pop_partial).
+        self._partial = array("d")
+        self._rejected: set[str] = set()
+        self.track_closed = False
+        self._newly_closed: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def apply(self, snapshots: dict[str, Snapshot]) -> int:
+        """Folds one snapshot batch into the arrays; returns symbols updated."""
+        batch_ts = None
+        minute_ms = day_ms = None
+        day = 0
+        updated = 0
+        for symbol, snap in snapshots.items():
+            if snap.ts != batch_ts:
+                # AKShare batches share one timestamp, so this runs once per tick.
+                batch_ts = snap.ts
+                minute_ms, day_ms, day = self._buckets_for(snap.ts)
+            if minute_ms is None:
+                continue
+            slot = self._slots.get(symbol)
+            if slot is None:
+                slot = self._allocate(symbol)
+                if slot is None:
+                    continue
+            self._update(slot, minute_ms, day_ms, day, snap)
+            updated += 1
+        return updated
+
+    def current(self, symbol: str, period: str) -> Bar | None:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return None
+        bars = self._minute if period == "1m" else self._daily if period == "1d" else None
+        if bars is None or math.isnan(bars[slot * _FIELDS]):
+            return None
+        return _to_bar(bars, slot * _FIELDS, False)
+
+    def bars(self, symbol: str, period: str) -> list[Bar]:
+        """The latest session's bars: closed minutes plus the forming one for
+        ``1m``, the forming day for ``1d``."""
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return []
+        out = []
+        if period == "1m":
+            closed = self._closed[slot]
+            out = [_to_bar(closed, offset, True) for offset in range(0, len(closed), _FIELDS)]
+        current = self.current(symbol, period)
+        if current is not None:
+            out.append(current)
+        return out
+
+    def tracks(self, symbol: str) -> bool:
+        return symbol in self._slots
+
+    def close_minutes(self) -> None:
+        """Closes every forming 1m bar once a session has ended."""
+        for slot in range(len(self._symbols)):
+            base = slot * _FIELDS
+            if not math.isnan(self._minute[base]):
+                self._close_minute(slot, base)
+                self._minute[base : base + _FIELDS] = array("d", _EMPTY_ROW)
+
+    def pop_closed(self) -> list[tuple[str, Bar]]:
+        """1m bars closed since the last call, leaving out a first minute whose
+        volume holds the day's totals; empty unless ``track_closed``."""
+        slots, self._newly_closed = self._newly_closed, []
+        out = []
+        for slot in slots:
+            closed = self._closed[slot]
+            out.append((self._symbols[slot], _to_bar(closed, len(closed) - _FIELDS, True)))
+        return out
+
+    def latest(self, period: str) -> Iterator[tuple[str, Bar]]:
+        for symbol in self._symbols:
+            bar = self.current(symbol, period)
+            if bar is not None:
+                yield symbol, bar
+
+    def nbytes(self) -> int:
+        arrays = [
+            self._minute,
+            self._daily,
+            self._prev_volume,
+            self._prev_amount,
+            self._day,
+            self._partial,
+            *self._closed,
+        ]
+        return sum(values.buffer_info()[1] * values.itemsize for values in arrays)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "symbols": len(self._symbols),
+            "capacity": self.capacity,
+            "rejected": len(self._rejected),
+            "bytes": self.nbytes(),
+        }
+
+    def _buckets_for(self, ts: datetime) -> tuple[int | None, int | None, int]:
+        ts_ms = epoch_ms(ts)
+        start = self._buckets.bucket_start(ts_ms, "1m")
+        if start is None:
+            return None, None, 0
+        return start, self._buckets.bucket_start(ts_ms, "1d"), self._buckets.local_day(ts_ms)
+
+    def _allocate(self, symbol: str) -> int | None:
+        if len(self._symbols) >= self.capacity:
+            if not self._rejected:
+                logger.warning("market bar memory budget reached at %s symbols", len(self._symbols))
+            self._rejected.add(symbol)
+            return None
+        slot = len(self._symbols)
+        self._slots[symbol] = slot
+        self._symbols.append(symbol)
+        self._minute.extend(_EMPTY_ROW)
+        self._daily.extend(_EMPTY_ROW)
+        self._closed.append(array("d"))
+        self._prev_volume.append(math.nan)
+        self._prev_amount.append(math.nan)
+        self._day.append(0)
+        self._partial.append(math.nan)
+        return slot
+
+    def _update(self, slot: int, minute_ms: int, day_ms: int, day: int, snap: Snapshot) -> None:
+        base = slot * _FIELDS
+        if self._day[slot] != day:
+            self._day[slot] = day
+            self._minute[base : base + _FIELDS] = array("d", _EMPTY_ROW)
+            self._daily[base : base + _FIELDS] = array("d", _EMPTY_ROW)
+            del self._closed[slot][:]
+            self._newly_closed = [other for other in self._newly_closed if other != slot]
+            self._prev_volume[slot] = math.nan
+            self._prev_amount[slot] = math.nan
+
+        minute = self._minute
+        if minute[base] != minute_ms:
+            if not math.isnan(minute[base]):
+                self._close_minute(slot, base)
+            _open_row(minute, base, minute_ms, snap.last)
+            if (
+                math.isnan(self._prev_volume[slot])
+                and snap.volume_total is not None
+                and minute_ms != self._buckets.day_open(minute_ms)
+            ):
+                self._partial[slot] = minute_ms
+        if self._daily[base] != day_ms:
+            _open_row(self._daily, base, day_ms, snap.last)
+
+        volume_delta, volume_reset = _delta(snap.volume_total, self._prev_volume, slot)
+        amount_delta, amount_reset = _delta(snap.amount_total, self._prev_amount, slot)
+        for bars in (minute, self._daily):
+            if snap.last > bars[base + 2]:
+                bars[base + 2] = snap.last
+            if snap.last < bars[base + 3]:
+                bars[base + 3] = snap.last
+            bars[base + 4] = snap.last
+            bars[base + 5] = volume_delta if volume_reset else bars[base + 5] + volume_delta
+            bars[base + 6] = amount_delta if amount_reset else bars[base + 6] + amount_delta
+
+    def _close_minute(self, slot: int, base: int) -> None:
+        self._closed[slot].extend(self._minute[base : base + _FIELDS])
+        if self.track_closed and self._minute[base] != self._partial[slot]:
+            self._newly_closed.append(slot)
+
+
+def _open_row(bars: array, base: int, ts_ms: float, price: float) -> None:
+    bars[base] = ts_ms
+    bars[base + 1] = bars[base + 2] = bars[base + 3] = bars[base + 4] = price
+    bars[base + 5] = bars[base + 6] = 0.0
+
+
+def _delta(total: float | None, previous: array, slot: int) -> tuple[float, bool]:
+    # Mirrors builder._apply_totals for 1m/1d: a falling total means the
+    # upstream counter restarted, so the bar takes the new total as-is.
+    if total is None:
+        return 0.0, False
+    prev = previous[slot]
+    previous[slot] = total
+    if math.isnan(prev):
+        return total, False
+    if total < prev:
+        return total, True
+    return total - prev, False
+
+
+def _to_bar(bars: array, base: int, is_closed: bool) -> Bar:
+    return Bar(
+        ts=int(bars[base]),
+        open=bars[base + 1],
+        high=bars[base + 2],
+        low=bars[base + 3],
+        close=bars[base + 4],
+        volume=bars[base + 5],
+        amount=bars[base + 6],
+        is_closed=is_closed,
+    )
@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime
 
 
 @dataclass
 class BarState:
-    bucket_start: datetime
+    bucket_start: int
     open: float
     high: float
     low: float
@@ -21,4 +20,4 @@ class SymbolState:
     cur_bar: BarState | None = None
     prev_volume_total: float | None = None
     prev_amount_total: float | None = None
-    last_trade_date: str | None = None
+    last_trade_date: int | None = None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import TypeVar
 
@@ -16,8 +17,15 @@ class _Entry:
 
 
 class MemoryCache(Cache):
-    def __init__(self) -> None:
-        self._store: dict[str, _Entry] = {}
+    """In-process cache holding at most ``max_entries`` keys, least recently
+    used first out, so that long stale TTLs cannot grow it without bound."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._store: OrderedDict[str, _Entry] = OrderedDict()
+        self._max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self._store)
 
     def get(self, key: str) -> T | None:
         entry = self._store.get(key)
@@ -26,7 +34,11 @@ class MemoryCache(Cache):
         if entry.expires_at < time.time():
             self._store.pop(key, None)
             return None
+        self._store.move_to_end(key)
         return entry.value  # type: ignore[return-value]
 
     def set(self, key: str, value: T, ttl_seconds: int) -> None:
         self._store[key] = _Entry(value=value, expires_at=time.time() + ttl_seconds)
+        self._store.move_to_end(key)
+        while len(self._store) > self._max_entries:
+            self._store.popitem(last=False)
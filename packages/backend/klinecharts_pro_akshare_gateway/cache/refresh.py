@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+
+from klinecharts_pro_akshare_gateway.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RefreshAheadValue(Generic[T]):
+    """Single value that is reloaded in the background before it expires.
+
+    The first ``get()`` loads synchronously (concurrent callers wait for the
+    same load). Afterwards readers always get the current copy immediately;
+    once it is older than ``refresh_ahead`` of the TTL one background thread
+    reloads it and swaps the reference.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], T],
+        ttl_seconds: float,
+        refresh_ahead: float = 0.8,
+        retry_seconds: float = 60.0,
+        name: str = "refresh-ahead",
+    ) -> None:
+        self._loader = loader
+        self._refresh_after = ttl_seconds * refresh_ahead
+        self._retry_seconds = min(retry_seconds, ttl_seconds)
+        self._name = name
+        self._value: T | None = None
+        self._loaded_at = 0.0
+        self._next_attempt = 0.0
+        self._load_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> T:
+        value = self._value
+        if value is None:
+            CACHE_REQUESTS.inc(self._name, "miss")
+            with self._load_lock:
+                if self._value is None:
+                    self._store(self._loader())
+                return self._value  # type: ignore[return-value]
+        now = time.monotonic()
+        if now - self._loaded_at >= self._refresh_after:
+            CACHE_REQUESTS.inc(self._name, "stale")
+            if now >= self._next_attempt:
+                self._start_refresh()
+        else:
+            CACHE_REQUESTS.inc(self._name, "hit")
+        return value
+
+    def _start_refresh(self) -> None:
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name=self._name, daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            value = self._loader()
+        except Exception:
+            logger.exception("%s reload failed", self._name)
+            self._next_attempt = time.monotonic() + self._retry_seconds
+        else:
+            self._store(value)
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+    def _store(self, value: T) -> None:
+        self._loaded_at = time.monotonic()
+        self._value = value
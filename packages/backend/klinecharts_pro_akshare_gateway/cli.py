@@ -4,6 +4,8 @@ import argparse
 
 import uvicorn
 
+from klinecharts_pro_akshare_gateway.config import get_settings
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="KLineChart Pro AKShare Gateway")
@@ -11,12 +13,14 @@ def main() -> None:
     parser.add_argument("--port", type=int, default=8000, help="Bind port")
     parser.add_argument("--log-level", default="info", help="Log level")
     args = parser.parse_args()
+    settings = get_settings()
 
     uvicorn.run(
         "klinecharts_pro_akshare_gateway.main:app",
         host=args.host,
         port=args.port,
         log_level=args.log_level,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
     )
 
 
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        brotli_enabled: bool = True,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._brotli = _import_brotli() if brotli_enabled else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _select_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self._brotli is not None
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliCompressor(self._brotli, self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self._middleware = middleware
+        self._encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._compressor = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or not content_type.startswith(_COMPRESSIBLE_TYPES):
+                self._passthrough = True
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compressor is None:
+            if not more_body and len(body) < self._middleware.minimum_size:
+                self._passthrough = True
+                await self._flush_start()
+                await self._send(message)
+                return
+            self._compressor = self._middleware._compressor(self._encoding)
+            headers = MutableHeaders(raw=self._start["headers"])
+            headers["Content-Encoding"] = self._encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self._compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._flush_start()
+
+        if more_body:
+            chunk = self._compressor.flush(body)
+        else:
+            chunk = self._compressor.finish(body)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _flush_start(self) -> None:
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._send(start)
+
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def flush(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, brotli, quality: int) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def flush(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+def _select_encoding(accept_encoding: str, brotli_available: bool) -> str | None:
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    if brotli_available and accepted.get("br", 0.0) > 0:
+        return "br"
+    if accepted.get("gzip", 0.0) > 0:
+        return "gzip"
+    return None
+
+
+def _import_brotli():
+    try:
+        import brotli  # type: ignore
+    except Exception:
+        return None
+    return brotli
@@ -6,18 +6,61 @@ class Settings(BaseSettings):
 
     timezone: str = "Asia/Shanghai"
     trading_sessions: str = "09:30-11:30,13:00-15:00"
-    snapshot_poll_interval_seconds: int = 3
+    snapshot_poll_interval_seconds: float = 3
     idle_backoff_seconds: int = 30
     max_active_symbols: int = 200
+    market_bars_enabled: bool = False
+    market_bars_memory_mb: int = 96
     cache_backend: str = "memory"
     redis_url: str = "redis://localhost:6379/0"
+    memory_cache_max_entries: int = 10_000
     history_max_limit: int = 2000
-    ws_ping_interval_seconds: int = 25
+    history_stream_max_bars: int = 200_000
+    history_batch_max_items: int = 50
+    history_batch_concurrency: int = 4
+    ws_ping_interval_seconds: float = 25
+    ws_ping_timeout_seconds: float = 10
+    ws_max_connections: int = 2000
+    ws_max_connections_per_ip: int = 50
+    ws_max_subscriptions_per_connection: int = 100
+    ws_max_subscriptions: int = 20000
     cors_allow_origins: str = "http://127.0.0.1:5173"
     minute_history_max_days: int = 7
+    minute_store_path: str = ""
+    minute_store_flush_seconds: float = 5.0
+    minute_store_batch_size: int = 2000
+    minute_store_retention_days: int = 30
     akshare_silent_progress: bool = False
+    akshare_import_strategy: str = "background"
+    provider_snapshot_concurrency: int = 1
+    provider_history_concurrency: int = 4
+    provider_metadata_concurrency: int = 2
+    provider_queue_timeout_seconds: float = 10.0
+    provider_process_workers: int = 0
+    provider_backend: str = "akshare"
+    synthetic_latency_ms: float = 0.0
+    synthetic_universe_size: int = 5000
+    replay_path: str = ""
+    replay_speed: float = 1.0
+    replay_fallback_backend: str = ""
+    snapshot_record_path: str = ""
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout_seconds: float = 30.0
+    history_stale_ttl_seconds: int = 7 * 24 * 60 * 60
     special_trading_sessions: str = ""
     closed_dates: str = ""
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    ws_per_message_deflate: bool = True
+    columnar_price_decimals: int = 3
+    indicators_enabled: bool = True
+    indicator_seed_bars: int = 500
+    admin_token: str = ""
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 1.0
+    profiling_max_traces: int = 200
 
 
 def get_settings() -> Settings:
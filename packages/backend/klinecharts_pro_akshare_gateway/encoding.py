@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import math
+
+from klinecharts_pro_akshare_gateway.models import ColumnarHistoryResponse, HistoryResponse
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.klinecharts.columnar+json"
+
+
+def wants_columnar(fmt: str | None, accept: str | None) -> bool:
+    if fmt:
+        return fmt == "columnar"
+    return bool(accept) and COLUMNAR_MEDIA_TYPE in accept
+
+
+def encode_columnar(response: HistoryResponse, price_decimals: int) -> ColumnarHistoryResponse:
+    scale = 10**price_decimals
+    items = response.items
+    # AKShare reports suspended rows with NaN prices; those go out as null.
+    first_close = next((bar.close for bar in items if math.isfinite(bar.close)), None)
+    out = ColumnarHistoryResponse.model_construct(
+        symbol=response.symbol,
+        period=response.period,
+        format="columnar",
+        ts_start=items[0].ts if items else None,
+        ts_delta=[],
+        price_scale=scale,
+        price_base=0 if first_close is None else round(first_close * scale),
+        open=[],
+        high=[],
+        low=[],
+        close=[],
+        volume=[],
+        amount=[],
+        next_from=response.next_from,
+        older_cursor=response.older_cursor,
+        newer_cursor=response.newer_cursor,
+        stale=response.stale,
+        indicators=response.indicators,
+    )
+    base = out.price_base
+    prev_ts = out.ts_start
+    for bar in items:
+        out.ts_delta.append(bar.ts - prev_ts)
+        prev_ts = bar.ts
+        out.open.append(_scaled(bar.open, scale, base))
+        out.high.append(_scaled(bar.high, scale, base))
+        out.low.append(_scaled(bar.low, scale, base))
+        out.close.append(_scaled(bar.close, scale, base))
+        out.volume.append(_compact_number(bar.volume))
+        out.amount.append(None if bar.amount is None else _compact_number(bar.amount))
+    return out
+
+
+def _scaled(value: float, scale: int, base: int) -> int | None:
+    if not math.isfinite(value):
+        return None
+    return round(value * scale) - base
+
+
+def _compact_number(value: float) -> int | float | None:
+    if isinstance(value, int):
+        return value
+    if not math.isfinite(value):
+        return None
+    if value.is_integer():
+        return int(value)
+    return value
@@ -0,0 +1 @@
+"""Technical indicators computed over history and live bars."""
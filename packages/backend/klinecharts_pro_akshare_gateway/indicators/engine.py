@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from klinecharts_pro_akshare_gateway.history import DAILY_PERIODS, HistoryService
+from klinecharts_pro_akshare_gateway.indicators.kernels import IndicatorSpec, Kernel, Values, compute
+from klinecharts_pro_akshare_gateway.models import Bar
+
+logger = logging.getLogger(__name__)
+
+_SERIES_CACHE_SIZE = 256
+_MINUTE_SEED_DAYS = 30
+
+IndicatorLines = dict[str, dict[str, list[float | None]]]
+
+
+@dataclass
+class _LiveIndicator:
+    kernel: Kernel
+    committed_ts: int | None = None
+    pending: tuple[int, float] | None = None
+    values: Values = field(default_factory=dict)
+
+    def apply(self, bar: Bar) -> Values | None:
+        if self.pending is not None and bar.ts > self.pending[0]:
+            self.kernel.commit(self.pending[1])
+            self.committed_ts = self.pending[0]
+            self.pending = None
+        if self.committed_ts is not None and bar.ts <= self.committed_ts:
+            return None
+        if bar.is_closed:
+            self.values = self.kernel.commit(bar.close)
+            self.committed_ts = bar.ts
+            self.pending = None
+        else:
+            self.values = self.kernel.preview(bar.close)
+            self.pending = (bar.ts, bar.close)
+        return self.values
+
+
+class IndicatorEngine:
+    """Indicator state per (symbol, period, indicator, params).
+
+    History requests get whole series computed in one pass and memoised by
+    the bars they cover, warmed up on the bars before the page so that
+    adjacent pages and live updates agree. Live subscriptions keep an incremental kernel
+    seeded from recent history; each bar event then costs O(1) per
+    indicator, and the in-progress bar is previewed without committing.
+    """
+
+    def __init__(self, history: HistoryService, seed_bars: int = 500) -> None:
+        self._history = history
+        self._seed_bars = seed_bars
+        self._live: dict[tuple[str, str], dict[str, _LiveIndicator]] = {}
+        self._series: OrderedDict[tuple, dict[str, list[float | None]]] = OrderedDict()
+        self._seeding: dict[tuple[str, str, str], asyncio.Task] = {}
+
+    async def series(
+        self, symbol: str, period: str, specs: list[IndicatorSpec], bars: list[Bar]
+    ) -> IndicatorLines:
+        if not bars:
+            return {spec.key: compute(spec, []) for spec in specs}
+        closes: list[float] | None = None
+        skip = 0
+        out: IndicatorLines = {}
+        for spec in specs:
+            key = (symbol, period, spec.key, bars[0].ts, bars[-1].ts, len(bars), bars[-1].close)
+            lines = self._series.get(key)
+            if lines is None:
+                if closes is None:
+                    lookback = max(item.warmup_bars for item in specs)
+                    warm = await self._bars_before(symbol, period, bars[0].ts, lookback)
+                    skip = len(warm)
+                    closes = [bar.close for bar in warm] + [bar.close for bar in bars]
+                lines = {name: values[skip:] for name, values in compute(spec, closes).items()}
+                self._series[key] = lines
+                if len(self._series) > _SERIES_CACHE_SIZE:
+                    self._series.popitem(last=False)
+            else:
+                self._series.move_to_end(key)
+            out[spec.key] = lines
+        return out
+
+    async def ensure(self, symbol: str, period: str, specs: list[IndicatorSpec]) -> None:
+        for spec in specs:
+            if spec.key in self._live.get((symbol, period), {}):
+                continue
+            token = (symbol, period, spec.key)
+            task = self._seeding.get(token)
+            if task is None:
+                task = asyncio.ensure_future(self._seed(symbol, period, spec))
+                self._seeding[token] = task
+                task.add_done_callback(lambda _, token=token: self._seeding.pop(token, None))
+            indicator = await asyncio.shield(task)
+            self._live.setdefault((symbol, period), {}).setdefault(spec.key, indicator)
+
+    def on_bar(self, symbol: str, period: str, bar: Bar) -> dict[str, Values]:
+        live = self._live.get((symbol, period))
+        if not live:
+            return {}
+        out = {}
+        for key, indicator in live.items():
+            values = indicator.apply(bar)
+            if values is not None:
+                out[key] = values
+        return out
+
+    def prune(self, required: set[tuple[str, str, str]]) -> None:
+        for (symbol, period), live in list(self._live.items()):
+            for key in list(live):
+                if (symbol, period, key) not in required:
+                    del live[key]
+            if not live:
+                del self._live[(symbol, period)]
+
+    async def _bars_before(self, symbol: str, period: str, ts: int, count: int) -> list[Bar]:
+        # Pages backwards from ``ts`` because minute pages stop after
+        # ``minute_history_max_days`` trading days.
+        start_ms = ts - _span_ms(period, count)
+        items: list[Bar] = []
+        anchor = ts
+        try:
+            while len(items) < count:
+                page = await self._history.get_page(
+                    symbol,
+                    period,
+                    start_ms,
+                    ts - 1,
+                    count - len(items),
+                    direction="backward",
+                    anchor_ms=anchor,
+                )
+                items = page.items + items
+                if not page.items or page.older is None:
+                    break
+                anchor = page.older.ts
+        except Exception as exc:
+            logger.warning("indicator warm-up failed for %s %s: %s", symbol, period, exc)
+        return items
+
+    async def _seed(self, symbol: str, period: str, spec: IndicatorSpec) -> _LiveIndicator:
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - _span_ms(period, self._seed_bars)
+        page = await self._history.get_page(
+            symbol, period, start_ms, end_ms, self._seed_bars, direction="backward"
+        )
+        indicator = _LiveIndicator(spec.kernel())
+        bars = page.items
+        for bar in bars[:-1]:
+            indicator.kernel.commit(bar.close)
+            indicator.committed_ts = bar.ts
+        if bars:
+            # The newest bar may still be forming; keep it pending so the
+            # live builder's version of it replaces rather than duplicates it.
+            indicator.pending = (bars[-1].ts, bars[-1].close)
+        return indicator
+
+
+def _span_ms(period: str, bars: int) -> int:
+    """Calendar span generously covering ``bars`` bars of ``period``."""
+    if period in DAILY_PERIODS:
+        days = bars * 2 * {"1w": 7, "1M": 31}.get(period, 1)
+    else:
+        days = max(_MINUTE_SEED_DAYS, math.ceil(bars * int(period[:-1]) / 240) * 2)
+    return days * 24 * 60 * 60 * 1000
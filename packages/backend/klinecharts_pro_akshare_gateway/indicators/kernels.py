@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import dataclass
+
+_DEFAULT_PARAMS: dict[str, tuple[float, ...]] = {
+    "MA": (5, 10, 30, 60),
+    "EMA": (6, 12, 20),
+    "MACD": (12, 26, 9),
+    "BOLL": (20, 2),
+    "RSI": (6, 12, 24),
+}
+_RESUM_EVERY = 1024
+_DECIMALS = 4
+# EMA-based lines never fully forget their start; after this many periods of
+# warm-up the difference is far below ``_DECIMALS``.
+_EMA_WARMUP_PERIODS = 10
+
+Values = dict[str, float | None]
+
+
+class InvalidIndicatorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    name: str
+    params: tuple[float, ...]
+
+    @classmethod
+    def parse(cls, value: str) -> IndicatorSpec:
+        """Parses ``"MA:5,10,30"``; the parameter list is optional."""
+        name, _, raw = value.strip().partition(":")
+        name = name.strip().upper()
+        if name not in _DEFAULT_PARAMS:
+            raise InvalidIndicatorError(f"unknown indicator: {name or value!r}")
+        if not raw.strip():
+            return cls(name, _DEFAULT_PARAMS[name])
+        try:
+            params = tuple(_number(part) for part in raw.split(",") if part.strip())
+        except ValueError as exc:
+            raise InvalidIndicatorError(f"invalid parameters: {value!r}") from exc
+        expected = {"MACD": 3, "BOLL": 2}.get(name)
+        if not params or (expected is not None and len(params) != expected):
+            raise InvalidIndicatorError(f"invalid parameters: {value!r}")
+        windows = params[:1] if name == "BOLL" else params
+        if any(window < 1 or window != int(window) or window > 1000 for window in windows):
+            raise InvalidIndicatorError(f"invalid parameters: {value!r}")
+        return cls(name, params)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{','.join(_format(param) for param in self.params)}"
+
+    @property
+    def warmup_bars(self) -> int:
+        """Bars to feed before the first one whose values should not depend
+        on where the series started."""
+        if self.name in {"EMA", "MACD"}:
+            return int(max(self.params)) * _EMA_WARMUP_PERIODS
+        if self.name == "BOLL":
+            return int(self.params[0])
+        return int(max(self.params)) + 1
+
+    def kernel(self) -> Kernel:
+        return _KERNELS[self.name](*self.params)
+
+
+class Kernel:
+    """Incremental indicator state over bar closes.
+
+    ``commit`` appends a closed bar and returns its values; ``preview``
+    returns the values the in-progress bar would have, without changing
+    state. Both are O(1) per call.
+    """
+
+    def commit(self, close: float) -> Values:
+        raise NotImplementedError
+
+    def preview(self, close: float) -> Values:
+        raise NotImplementedError
+
+
+def compute(spec: IndicatorSpec, closes: list[float]) -> dict[str, list[float | None]]:
+    """Indicator lines over a whole close series in a single pass."""
+    kernel = spec.kernel()
+    lines: dict[str, list[float | None]] = {}
+    for close in closes:
+        for name, value in kernel.commit(close).items():
+            lines.setdefault(name, []).append(value)
+    if not lines:
+        lines = {name: [] for name in kernel.preview(0.0)}
+    return lines
+
+
+class _Window:
+    """Last ``size - 1`` committed values with running sum and sum of squares."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.values: deque[float] = deque()
+        self.total = 0.0
+        self.squares = 0.0
+        self._commits = 0
+
+    def full(self) -> bool:
+        return len(self.values) >= self.size - 1
+
+    def push(self, value: float) -> None:
+        if self.size <= 1:
+            return
+        if len(self.values) == self.size - 1:
+            old = self.values.popleft()
+            self.total -= old
+            self.squares -= old * old
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+        self._commits += 1
+        if self._commits % _RESUM_EVERY == 0:
+            # Running sums drift; rebuild them exactly every so often.
+            self.total = math.fsum(self.values)
+            self.squares = math.fsum(v * v for v in self.values)
+
+
+class _MA(Kernel):
+    def __init__(self, *periods: float) -> None:
+        self._windows = [(f"ma{_format(p)}", _Window(int(p))) for p in periods]
+
+    def preview(self, close: float) -> Values:
+        return {
+            name: _round((window.total + close) / window.size) if window.full() else None
+            for name, window in self._windows
+        }
+
+    def commit(self, close: float) -> Values:
+        values = self.preview(close)
+        for _, window in self._windows:
+            window.push(close)
+        return values
+
+
+class _EMAState:
+    def __init__(self, period: int) -> None:
+        self.alpha = 2 / (period + 1)
+        self.value: float | None = None
+
+    def preview(self, x: float) -> float:
+        if self.value is None:
+            return x
+        return self.alpha * x + (1 - self.alpha) * self.value
+
+
+class _EMA(Kernel):
+    def __init__(self, *periods: float) -> None:
+        self._states = [(f"ema{_format(p)}", _EMAState(int(p))) for p in periods]
+
+    def preview(self, close: float) -> Values:
+        return {name: _round(state.preview(close)) for name, state in self._states}
+
+    def commit(self, close: float) -> Values:
+        values = {}
+        for name, state in self._states:
+            state.value = state.preview(close)
+            values[name] = _round(state.value)
+        return values
+
+
+class _MACD(Kernel):
+    def __init__(self, short: float = 12, long: float = 26, signal: float = 9) -> None:
+        self._short = _EMAState(int(short))
+        self._long = _EMAState(int(long))
+        self._signal = _EMAState(int(signal))
+
+    def _values(self, close: float) -> tuple[float, float, float, Values]:
+        short = self._short.preview(close)
+        long = self._long.preview(close)
+        dif = short - long
+        dea = self._signal.preview(dif)
+        return short, long, dea, {"dif": _round(dif), "dea": _round(dea), "macd": _round((dif - dea) * 2)}
+
+    def preview(self, close: float) -> Values:
+        return self._values(close)[3]
+
+    def commit(self, close: float) -> Values:
+        short, long, dea, values = self._values(close)
+        self._short.value, self._long.value, self._signal.value = short, long, dea
+        return values
+
+
+class _BOLL(Kernel):
+    def __init__(self, period: float = 20, width: float = 2) -> None:
+        self._window = _Window(int(period))
+        self._width = width
+
+    def preview(self, close: float) -> Values:
+        window = self._window
+        if not window.full():
+            return {"up": None, "mid": None, "dn": None}
+        mid = (window.total + close) / window.size
+        variance = (window.squares + close * close) / window.size - mid * mid
+        spread = self._width * math.sqrt(max(variance, 0.0))
+        return {"up": _round(mid + spread), "mid": _round(mid), "dn": _round(mid - spread)}
+
+    def commit(self, close: float) -> Values:
+        values = self.preview(close)
+        self._window.push(close)
+        return values
+
+
+class _RSI(Kernel):
+    # Simple (non-Wilder) sums of gains and losses over the window, as
+    # KLineChart computes it client-side.
+    def __init__(self, *periods: float) -> None:
+        self._windows = [(f"rsi{_format(p)}", _Window(int(p)), _Window(int(p))) for p in periods]
+        self._prev: float | None = None
+
+    def preview(self, close: float) -> Values:
+        values: Values = {}
+        for name, gains, losses in self._windows:
+            if self._prev is None or not gains.full():
+                values[name] = None
+                continue
+            change = close - self._prev
+            up = gains.total + max(change, 0.0)
+            down = losses.total + max(-change, 0.0)
+            values[name] = _round(100 * up / (up + down)) if up + down else 50.0
+        return values
+
+    def commit(self, close: float) -> Values:
+        values = self.preview(close)
+        if self._prev is not None:
+            change = close - self._prev
+            for _, gains, losses in self._windows:
+                gains.push(max(change, 0.0))
+                losses.push(max(-change, 0.0))
+        self._prev = close
+        return values
+
+
+_KERNELS: dict[str, type[Kernel]] = {
+    "MA": _MA,
+    "EMA": _EMA,
+    "MACD": _MACD,
+    "BOLL": _BOLL,
+    "RSI": _RSI,
+}
+
+
+def _number(value: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _round(value: float) -> float:
+    return round(value, _DECIMALS)
@@ -1,42 +1,110 @@
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
+from functools import partial
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from klinecharts_pro_akshare_gateway.api.router import router as api_router
 from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder
+from klinecharts_pro_akshare_gateway.barbuilder.market import MarketBars
 from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache
-from klinecharts_pro_akshare_gateway.cache.redis import RedisCache
+from klinecharts_pro_akshare_gateway.compression import CompressionMiddleware
 from klinecharts_pro_akshare_gateway.config import get_settings
+from klinecharts_pro_akshare_gateway.history import HistoryService
+from klinecharts_pro_akshare_gateway.metrics import Gauge, ResponseSizeMiddleware, registry
 from klinecharts_pro_akshare_gateway.poller import Poller
-from klinecharts_pro_akshare_gateway.provider.akshare import AkshareConfig, AkshareProvider
+from klinecharts_pro_akshare_gateway.profiling import ProfilingMiddleware, profiler
 from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider
+from klinecharts_pro_akshare_gateway.provider.circuit import CircuitBreakerProvider
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock
 from klinecharts_pro_akshare_gateway.ws.routes import router as ws_router
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
+    app.state.startup_timings = timings
+    app.state.ready = False
     settings = get_settings()
-    provider = AkshareProvider(
-        config=AkshareConfig(silent_progress=settings.akshare_silent_progress)
+    provider = _create_provider(settings)
+    timings["provider_init"] = time.perf_counter() - started
+    async_provider = AsyncProvider(
+        provider,
+        snapshot_concurrency=settings.provider_snapshot_concurrency,
+        history_concurrency=settings.provider_history_concurrency,
+        metadata_concurrency=settings.provider_metadata_concurrency,
+        queue_timeout_seconds=settings.provider_queue_timeout_seconds,
+    )
+    _register_provider_gauges(async_provider)
+    trading_clock = TradingClock.from_settings(settings)
+    market_bars = (
+        MarketBars(trading_clock, settings.market_bars_memory_mb * 1024 * 1024)
+        if settings.market_bars_enabled
+        else None
     )
-    async_provider = AsyncProvider(provider)
-    bar_builder = BarBuilder(tz_name=settings.timezone)
-    poller = Poller(async_provider, bar_builder, settings)
+    if market_bars is not None:
+        _register_market_gauges(market_bars)
+    bar_builder = BarBuilder(trading_clock, market=market_bars)
     history_cache = _create_history_cache(settings)
+    minute_writer = _create_minute_writer(settings)
+    history_service = HistoryService(
+        async_provider, history_cache, settings, trading_clock, minute_store=minute_writer
+    )
+    indicator_engine = None
+    if settings.indicators_enabled:
+        from klinecharts_pro_akshare_gateway.indicators.engine import IndicatorEngine
+
+        indicator_engine = IndicatorEngine(history_service, settings.indicator_seed_bars)
+    poller = Poller(
+        async_provider,
+        bar_builder,
+        settings,
+        clock=trading_clock,
+        indicators=indicator_engine,
+        minute_writer=minute_writer,
+    )
 
     app.state.settings = settings
     app.state.provider = provider
     app.state.async_provider = async_provider
     app.state.bar_builder = bar_builder
     app.state.poller = poller
+    app.state.trading_clock = trading_clock
     app.state.history_cache = history_cache
+    app.state.history_service = history_service
+    app.state.indicator_engine = indicator_engine
+    app.state.minute_writer = minute_writer
 
+    warm_up_task = None
+    strategy = settings.akshare_import_strategy
+    if strategy == "eager":
+        await _warm_up(app, async_provider, started)
+    elif strategy == "background":
+        warm_up_task = asyncio.create_task(_warm_up(app, async_provider, started))
+    else:
+        # "lazy" imports AKShare on the first upstream call, so /ready cannot
+        # wait for it without deadlocking behind a readiness-gated load balancer.
+        app.state.ready = True
+    timings["lifespan_startup"] = time.perf_counter() - started
+
+    if minute_writer is not None:
+        minute_writer.start()
     poller.start()
     try:
         yield
     finally:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
         await poller.stop()
+        if minute_writer is not None:
+            await minute_writer.stop()
+        provider.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -50,6 +118,20 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
+    profiler.configure(
+        enabled=settings.profiling_enabled,
+        sample_rate=settings.profiling_sample_rate,
+        max_traces=settings.profiling_max_traces,
+    )
+    app.add_middleware(ResponseSizeMiddleware, path_prefix="/api/v1/bars")
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, path_prefix="/api/v1/bars/history")
     app.include_router(api_router, prefix="/api/v1")
     app.include_router(ws_router, prefix="/api/v1")
     return app
@@ -58,7 +140,125 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
+def _create_provider(settings):
+    factory = _provider_factory(settings, settings.provider_backend)
+    if settings.provider_process_workers > 0:
+        from klinecharts_pro_akshare_gateway.provider.process_pool import ProcessPoolProvider
+
+        provider = ProcessPoolProvider(factory, workers=settings.provider_process_workers)
+    else:
+        provider = factory()
+    return CircuitBreakerProvider(
+        provider,
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_timeout_seconds=settings.circuit_reset_timeout_seconds,
+    )
+
+
+def _provider_factory(settings, backend: str):
+    # Backends are imported only when selected, to keep them off the startup path.
+    if backend == "replay":
+        fallback = settings.replay_fallback_backend
+        if fallback == "replay":
+            raise ValueError("REPLAY_FALLBACK_BACKEND cannot be replay")
+        return partial(
+            _replay_provider,
+            settings.replay_path,
+            settings.replay_speed,
+            settings.timezone,
+            _provider_factory(settings, fallback) if fallback else None,
+        )
+    if backend == "synthetic":
+        from klinecharts_pro_akshare_gateway.provider.synthetic import SyntheticConfig, SyntheticProvider
+
+        latency = settings.synthetic_latency_ms / 1000
+        return partial(
+            SyntheticProvider,
+            config=SyntheticConfig(
+                universe_size=settings.synthetic_universe_size,
+                history_latency=latency,
+                snapshot_latency=latency,
+                metadata_latency=latency,
+                timezone=settings.timezone,
+                trading_sessions=settings.trading_sessions,
+            ),
+        )
+    from klinecharts_pro_akshare_gateway.provider.akshare import AkshareConfig, AkshareProvider
+
+    return partial(
+        AkshareProvider,
+        config=AkshareConfig(silent_progress=settings.akshare_silent_progress),
+    )
+
+
+def _replay_provider(path, speed, tz_name, fallback_factory):
+    # Module level so the factory stays picklable for PROVIDER_PROCESS_WORKERS.
+    from klinecharts_pro_akshare_gateway.provider.replay import ReplayProvider
+
+    fallback = fallback_factory() if fallback_factory is not None else None
+    return ReplayProvider(path, speed=speed, fallback=fallback, tz_name=tz_name)
+
+
+async def _warm_up(app: FastAPI, async_provider: AsyncProvider, started: float) -> None:
+    warm_started = time.perf_counter()
+    try:
+        await async_provider.warm_up()
+    except Exception:
+        logger.exception("provider warm-up failed")
+    app.state.startup_timings["provider_warm_up"] = time.perf_counter() - warm_started
+    app.state.startup_timings["ready"] = time.perf_counter() - started
+    app.state.ready = True
+
+
+def _register_provider_gauges(async_provider: AsyncProvider) -> None:
+    for key, help_text in (
+        ("in_flight", "Upstream calls holding a provider pool slot, by pool."),
+        ("waiting", "Upstream calls queued for a provider pool slot, by pool."),
+        ("capacity", "Provider pool size, by pool."),
+    ):
+        registry.register(
+            Gauge(
+                f"gateway_provider_pool_{key}",
+                help_text,
+                ("pool",),
+                callback=lambda key=key: {(name,): pool[key] for name, pool in async_provider.stats().items()},
+            )
+        )
+
+
+def _register_market_gauges(market_bars: MarketBars) -> None:
+    registry.register(
+        Gauge(
+            "gateway_market_bar_symbols",
+            "Symbols tracked by the full-market bar store.",
+            callback=lambda: len(market_bars),
+        )
+    )
+    registry.register(
+        Gauge(
+            "gateway_market_bar_bytes",
+            "Bytes held in the full-market bar store's arrays.",
+            callback=market_bars.nbytes,
+        )
+    )
+
+
+def _create_minute_writer(settings):
+    if not settings.minute_store_path:
+        return None
+    from klinecharts_pro_akshare_gateway.store.minute import MinuteBarStore, MinuteBarWriter
+
+    return MinuteBarWriter(
+        MinuteBarStore(settings.minute_store_path, settings.timezone),
+        flush_interval=settings.minute_store_flush_seconds,
+        batch_size=settings.minute_store_batch_size,
+        retention_days=settings.minute_store_retention_days,
+    )
+
+
 def _create_history_cache(settings):
     if settings.cache_backend == "redis":
+        from klinecharts_pro_akshare_gateway.cache.redis import RedisCache
+
         return RedisCache(settings.redis_url)
-    return MemoryCache()
+    return MemoryCache(settings.memory_cache_max_entries)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from klinecharts_pro_akshare_gateway.encoding import wants_columnar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_COUNT_BUCKETS = (0, 1, 10, 50, 100, 250, 500, 1000, 2000, 5000, 10000)
+_BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+
+    def _label_str(self, labels: tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{self._label_str(labels)} {_format(value)}"
+
+
+class Gauge(_Metric):
+    """Gauge whose value is either set directly or read from ``callback``
+    at scrape time, so hot paths pay nothing for it."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Callable[[], float | dict[tuple[str, ...], float]] | None = None,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> Iterable[str]:
+        values = dict(self._values)
+        if self.callback is not None:
+            result = self.callback()
+            if isinstance(result, dict):
+                values.update(result)
+            else:
+                values[()] = result
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{self._label_str(labels)} {_format(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._buckets = buckets
+        # Per label set: non-cumulative bucket counts (+Inf last), then sum.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self._buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{_format(bound)}"'
+                yield f"{self.name}_bucket{self._label_str(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_str(labels)} {_format(total)}"
+            yield f"{self.name}_count{self._label_str(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+UPSTREAM_SECONDS = registry.register(
+    Histogram(
+        "gateway_upstream_call_seconds",
+        "Latency of upstream AKShare calls by provider function and outcome.",
+        ("function", "outcome"),
+    )
+)
+CACHE_REQUESTS = registry.register(
+    Counter(
+        "gateway_cache_requests_total",
+        "Cache lookups by cache and result (hit, stale, miss).",
+        ("cache", "result"),
+    )
+)
+POLL_CYCLE_SECONDS = registry.register(
+    Histogram("gateway_poll_cycle_seconds", "Duration of one snapshot poll cycle.")
+)
+POLL_LAG_SECONDS = registry.register(
+    Histogram(
+        "gateway_poll_lag_seconds",
+        "How late a poll cycle started relative to its scheduled interval.",
+    )
+)
+BUILDER_EVENTS = registry.register(
+    Histogram(
+        "gateway_builder_events_per_tick",
+        "Bar events emitted by the bar builder per poll cycle.",
+        buckets=_COUNT_BUCKETS,
+    )
+)
+WS_SENDS_IN_FLIGHT = registry.register(
+    Gauge("gateway_ws_sends_in_flight", "WebSocket sends started but not yet completed.")
+)
+WS_SEND_SECONDS = registry.register(
+    Histogram("gateway_ws_send_seconds", "Duration of a single WebSocket send.")
+)
+WS_REJECTIONS = registry.register(
+    Counter(
+        "gateway_ws_rejections_total",
+        "WebSocket connections and subscriptions refused by a cap, by reason.",
+        ("reason",),
+    )
+)
+WS_REAPED = registry.register(
+    Counter("gateway_ws_reaped_total", "WebSocket connections closed for missing heartbeat replies.")
+)
+HISTORY_RESPONSE_BARS = registry.register(
+    Histogram(
+        "gateway_history_response_bars",
+        "Bars returned per history response (see gateway_history_response_bytes for size).",
+        ("format",),
+        buckets=_COUNT_BUCKETS,
+    )
+)
+HISTORY_RESPONSE_BYTES = registry.register(
+    Histogram(
+        "gateway_history_response_bytes",
+        "Body bytes sent per bars response after encoding and compression.",
+        ("format", "encoding"),
+        buckets=_BYTE_BUCKETS,
+    )
+)
+PROVIDER_QUEUE_WAIT_SECONDS = registry.register(
+    Histogram(
+        "gateway_provider_queue_wait_seconds",
+        "Time upstream calls waited for a provider pool slot, by pool.",
+        ("pool",),
+    )
+)
+PROVIDER_QUEUE_TIMEOUTS = registry.register(
+    Counter(
+        "gateway_provider_queue_timeouts_total",
+        "Upstream calls rejected after waiting PROVIDER_QUEUE_TIMEOUT_SECONDS, by pool.",
+        ("pool",),
+    )
+)
+
+
+class ResponseSizeMiddleware:
+    """Records ``HISTORY_RESPONSE_BYTES`` for responses under ``path_prefix``.
+    Added outside compression so that it sees the bytes actually sent."""
+
+    def __init__(self, app: ASGIApp, path_prefix: str) -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        request_format = _request_format(scope)
+        labels = (request_format, "identity")
+        size = 0
+
+        async def counting_send(message: Message) -> None:
+            nonlocal labels, size
+            if message["type"] == "http.response.start":
+                headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"")
+                labels = (
+                    "ndjson" if b"ndjson" in content_type else request_format,
+                    headers.get(b"content-encoding", b"identity").decode("latin-1"),
+                )
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    HISTORY_RESPONSE_BYTES.observe(size, *labels)
+            await send(message)
+
+        await self.app(scope, receive, counting_send)
+
+
+def _request_format(scope: Scope) -> str:
+    # Columnar bodies are served as application/json, so the format comes
+    # from the request the same way the endpoints choose it.
+    fmt = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("format", [None])[0]
+    accept = next((value.decode("latin-1") for key, value in scope["headers"] if key == b"accept"), None)
+    return "columnar" if wants_columnar(fmt, accept) else "json"
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SymbolInfo(BaseModel):
@@ -15,8 +16,14 @@ class SymbolInfo(BaseModel):
     timezone: str = "Asia/Shanghai"
 
 
-class Bar(BaseModel):
-    ts: int = Field(..., description="UTC milliseconds")
+# A slotted dataclass rather than a model: providers, the builder, caches and
+# aggregation allocate thousands of bars per page or tick, and response models
+# accept and serialize dataclass instances without copying them.
+@dataclass(slots=True)
+class Bar:
+    """One OHLCV bar."""
+
+    ts: Annotated[int, Field(description="UTC milliseconds")]
     open: float
     high: float
     low: float
@@ -25,12 +32,76 @@ class Bar(BaseModel):
     amount: float | None = None
     is_closed: bool | None = None
 
+    def as_row(self) -> tuple:
+        return (self.ts, self.open, self.high, self.low, self.close, self.volume, self.amount, self.is_closed)
+
 
 class HistoryResponse(BaseModel):
     symbol: str
     period: str
     items: list[Bar]
     next_from: int | None = None
+    older_cursor: str | None = None
+    newer_cursor: str | None = None
+    stale: bool = False
+    indicators: dict[str, dict[str, list[float | None]]] | None = None
+
+
+class ColumnarHistoryResponse(BaseModel):
+    symbol: str
+    period: str
+    format: Literal["columnar"] = "columnar"
+    ts_start: int | None = None
+    ts_delta: list[int] = Field(default_factory=list, description="ms since previous bar")
+    price_scale: int
+    price_base: int = Field(0, description="scaled close of the first bar with a finite close")
+    open: list[int | None] = Field(default_factory=list, description="null for non-finite prices")
+    high: list[int | None] = Field(default_factory=list)
+    low: list[int | None] = Field(default_factory=list)
+    close: list[int | None] = Field(default_factory=list)
+    volume: list[int | float | None] = Field(default_factory=list)
+    amount: list[int | float | None] = Field(default_factory=list)
+    next_from: int | None = None
+    older_cursor: str | None = None
+    newer_cursor: str | None = None
+    stale: bool = False
+    indicators: dict[str, dict[str, list[float | None]]] | None = None
+
+
+class HistoryStreamChunk(BaseModel):
+    items: list[Bar]
+    stale: bool = False
+
+
+class HistoryStreamEnd(BaseModel):
+    done: Literal[True] = True
+    count: int
+    next_from: int | None = None
+    error: str | None = None
+
+
+class BatchHistoryItem(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    symbol: str
+    period: str
+    from_: str = Field(..., alias="from")
+    to: str
+    limit: int = Field(2000, ge=1, le=2000)
+    direction: Literal["forward", "backward"] = "forward"
+    cursor: str | None = None
+    indicators: str | None = None
+
+
+class BatchHistoryRequest(BaseModel):
+    items: list[BatchHistoryItem]
+    format: Literal["json", "columnar"] | None = None
+
+
+class BatchHistoryResult(BaseModel):
+    index: int
+    result: HistoryResponse | ColumnarHistoryResponse | None = None
+    error: str | None = None
 
 
 class SymbolSearchResponse(BaseModel):
@@ -41,6 +112,7 @@ class SubscribeRequest(BaseModel):
     op: Literal["subscribe", "unsubscribe"]
     symbol: str
     period: str
+    indicators: list[str] | None = None
 
 
 class BarEvent(BaseModel):
@@ -48,6 +120,7 @@ class BarEvent(BaseModel):
     symbol: str
     period: str
     bar: Bar
+    indicators: dict[str, dict[str, float | None]] | None = None
 
 
 class StatusEvent(BaseModel):
@@ -61,6 +134,7 @@ class SubscribeAck(BaseModel):
     op: Literal["subscribed"]
     symbol: str
     period: str
+    indicators: list[str] | None = None
 
 
 class ErrorEvent(BaseModel):
@@ -68,6 +142,11 @@ class ErrorEvent(BaseModel):
     reason: str
 
 
+class PingEvent(BaseModel):
+    op: Literal["ping", "pong"]
+    ts: int
+
+
 class Snapshot(BaseModel):
     ts: datetime
     last: float
@@ -2,16 +2,31 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 from dataclasses import dataclass
-from datetime import datetime, time
-from zoneinfo import ZoneInfo
+from datetime import date, datetime
+from typing import TYPE_CHECKING
 
 from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder
 from klinecharts_pro_akshare_gateway.config import Settings
-from klinecharts_pro_akshare_gateway.models import BarEvent, StatusEvent
+from klinecharts_pro_akshare_gateway.metrics import (
+    BUILDER_EVENTS,
+    POLL_CYCLE_SECONDS,
+    POLL_LAG_SECONDS,
+    WS_SEND_SECONDS,
+    WS_SENDS_IN_FLIGHT,
+)
+from klinecharts_pro_akshare_gateway.models import Bar, BarEvent, Snapshot, StatusEvent
+from klinecharts_pro_akshare_gateway.profiling import phase, profiler
 from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider
+from klinecharts_pro_akshare_gateway.provider.circuit import CircuitOpenError
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock
 from klinecharts_pro_akshare_gateway.ws.hub import hub
 
+if TYPE_CHECKING:
+    from klinecharts_pro_akshare_gateway.indicators.engine import IndicatorEngine
+    from klinecharts_pro_akshare_gateway.store.minute import MinuteBarWriter
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,59 +47,44 @@ class Backoff:
         self._current = 0
 
 
-class TradingClock:
-    def __init__(
-        self,
-        tz_name: str,
-        sessions: str,
-        special_sessions: dict[str, list[tuple[time, time]]],
-        closed_dates: set[str],
-    ) -> None:
-        self._tz = ZoneInfo(tz_name)
-        self._sessions = _parse_sessions(sessions)
-        self._special_sessions = special_sessions
-        self._closed_dates = closed_dates
-        self._calendar: set[str] | None = None
-
-    def now(self) -> datetime:
-        return datetime.now(tz=self._tz)
-
-    def is_trading_time(self, dt: datetime) -> bool:
-        if not self.is_trading_day(dt):
-            return False
-        t = dt.time()
-        sessions = self._special_sessions.get(dt.date().isoformat(), self._sessions)
-        return any(start <= t <= end for start, end in sessions)
-
-    def is_trading_day(self, dt: datetime) -> bool:
-        if dt.date().isoformat() in self._closed_dates:
-            return False
-        if self._calendar is None:
-            return dt.weekday() < 5
-        return dt.date().isoformat() in self._calendar
-
-    def update_calendar(self, calendar: set[str]) -> None:
-        self._calendar = calendar
-
-
 class Poller:
     def __init__(
         self,
         provider: AsyncProvider,
         bar_builder: BarBuilder,
         settings: Settings,
+        clock: TradingClock | None = None,
+        indicators: IndicatorEngine | None = None,
+        minute_writer: MinuteBarWriter | None = None,
     ) -> None:
         self._provider = provider
+        self._indicators = indicators
+        self._minute_writer = minute_writer
+        if minute_writer is not None and bar_builder.market is not None:
+            # The market store persists its own symbols' minutes, subscribed or not.
+            bar_builder.market.track_closed = True
+        self._in_session = False
         self._bar_builder = bar_builder
         self._settings = settings
-        self._clock = TradingClock(
-            settings.timezone,
-            settings.trading_sessions,
-            _parse_special_sessions(settings.special_trading_sessions),
-            _parse_closed_dates(settings.closed_dates),
-        )
+        # A peer that stops reading must not hold up the fan-out to everyone else.
+        self._send_timeout = settings.ws_ping_timeout_seconds or None
+        # A replay carries its own timestamps, so it runs regardless of the wall clock.
+        self._replay = settings.provider_backend == "replay"
+        self._clock = clock or TradingClock.from_settings(settings)
+        self._calendar_date: date | None = None
+        self._calendar_backoff = Backoff(base_seconds=30, max_seconds=300)
+        self._calendar_retry_at = 0.0
         self._task: asyncio.Task | None = None
         self._stop_event = asyncio.Event()
+        self._recorder = None
+        if settings.snapshot_record_path:
+            from klinecharts_pro_akshare_gateway.provider.replay import SnapshotRecorder
+
+            self._recorder = SnapshotRecorder(settings.snapshot_record_path)
+
+    @property
+    def clock(self) -> TradingClock:
+        return self._clock
 
     def start(self) -> None:
         if self._task is None:
@@ -98,101 +98,178 @@ class Poller:
                 await self._task
             except asyncio.CancelledError:
                 pass
+        if self._recorder is not None:
+            self._recorder.close()
 
     async def run(self) -> None:
         backoff = Backoff()
-        await self._refresh_calendar()
         while not self._stop_event.is_set():
             now = self._clock.now()
-            if not self._clock.is_trading_time(now):
-                await asyncio.sleep(self._settings.idle_backoff_seconds)
+            if self._calendar_date != now.date() and time.monotonic() >= self._calendar_retry_at:
+                await self._refresh_calendar(now.date())
+            if not self._replay and not self._clock.is_trading_time(now):
+                if self._in_session:
+                    self._in_session = False
+                    await self._dispatch(self._bar_builder.close_intraday())
+                await self._sleep_until_session(now)
                 continue
 
             symbols = hub.get_active_symbols()
-            if not symbols:
+            full_market = self._bar_builder.market is not None
+            if not symbols and not full_market:
                 await asyncio.sleep(self._settings.snapshot_poll_interval_seconds)
                 continue
 
-            try:
-                snapshots = await self._provider.get_realtime_snapshot_batch(symbols)
-            except Exception:
-                logger.exception("snapshot failed")
-                await _broadcast_status("snapshot failed", code="snapshot_failed", level="error")
-                await asyncio.sleep(backoff.next())
+            cycle_started = time.perf_counter()
+            with profiler.trace("poll"):
+                try:
+                    with phase("fetch"):
+                        snapshots = await self._provider.get_realtime_snapshot_batch(
+                            None if full_market else symbols
+                        )
+                except CircuitOpenError as exc:
+                    await _broadcast_status(
+                        "upstream unavailable",
+                        code="upstream_unavailable",
+                        level="warning",
+                        timeout=self._send_timeout,
+                    )
+                    delay = max(exc.retry_after, self._settings.snapshot_poll_interval_seconds)
+                except Exception:
+                    logger.exception("snapshot failed")
+                    await _broadcast_status(
+                        "snapshot failed", code="snapshot_failed", level="error", timeout=self._send_timeout
+                    )
+                    delay = backoff.next()
+                else:
+                    backoff.reset()
+                    delay = None
+                    if self._recorder is not None:
+                        await self._record(snapshots)
+                    try:
+                        await self.publish(snapshots, set(symbols) if full_market else None)
+                    except Exception:
+                        # Never let one bad cycle end the loop every client depends on.
+                        logger.exception("publishing snapshots failed")
+                    self._in_session = True
+                    POLL_CYCLE_SECONDS.observe(time.perf_counter() - cycle_started)
+
+            if delay is not None:
+                await asyncio.sleep(delay)
                 continue
-
-            backoff.reset()
-            events = self._bar_builder.apply_snapshots(snapshots)
+            await _sleep_measuring_lag(self._settings.snapshot_poll_interval_seconds)
+
+    async def publish(self, snapshots: dict[str, Snapshot], active: set[str] | None = None) -> int:
+        """Feeds one snapshot batch through the bar builder and broadcasts the
+        resulting bar events; returns the number of events."""
+        with phase("build"):
+            events = self._bar_builder.apply_snapshots(snapshots, active)
+        BUILDER_EVENTS.observe(len(events))
+        await self._dispatch(events)
+        return len(events)
+
+    async def _dispatch(self, events: list[tuple[str, str, Bar]]) -> None:
+        writer = self._minute_writer
+        market = self._bar_builder.market
+        with phase("send"):
             for symbol, period, bar in events:
-                await _broadcast_bar(symbol, period, bar)
+                if (
+                    period == "1m"
+                    and bar.is_closed
+                    and not self._bar_builder.pop_partial(symbol, bar.ts)
+                    and writer is not None
+                    and (market is None or not market.tracks(symbol))
+                ):
+                    writer.add(symbol, bar)
+                values = self._indicators.on_bar(symbol, period, bar) if self._indicators else None
+                await _broadcast_bar(symbol, period, bar, values, timeout=self._send_timeout)
+        if writer is not None and market is not None:
+            for symbol, bar in market.pop_closed():
+                writer.add(symbol, bar)
+
+    async def _record(self, snapshots: dict[str, Snapshot]) -> None:
+        try:
+            await asyncio.to_thread(self._recorder.append, snapshots)
+        except Exception:
+            logger.exception("snapshot recording failed")
 
-            await asyncio.sleep(self._settings.snapshot_poll_interval_seconds)
-            if now.hour == 0 and now.minute < 5:
-                await self._refresh_calendar()
+    async def _sleep_until_session(self, now: datetime) -> None:
+        next_open = self._clock.next_session_open(now)
+        if next_open is None:
+            delay = self._settings.idle_backoff_seconds
+        else:
+            delay = max(0.0, (next_open - self._clock.now()).total_seconds())
+        if self._calendar_date != now.date():
+            # Wake up for the next calendar retry rather than sleeping on a stale calendar.
+            delay = min(delay, max(0.0, self._calendar_retry_at - time.monotonic()))
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
 
-    async def _refresh_calendar(self) -> None:
+    async def _refresh_calendar(self, today: date) -> None:
         try:
             calendar = await self._provider.get_trading_calendar()
-            if calendar:
-                self._clock.update_calendar(calendar)
         except Exception:
+            self._calendar_retry_at = time.monotonic() + self._calendar_backoff.next()
             logger.exception("trading calendar load failed")
-            await _broadcast_status("trading calendar load failed", code="calendar_failed", level="warning")
-
-
-async def _broadcast_bar(symbol: str, period: str, bar) -> None:
+            await _broadcast_status(
+                "trading calendar load failed",
+                code="calendar_failed",
+                level="warning",
+                timeout=self._send_timeout,
+            )
+            return
+        if calendar:
+            self._clock.update_calendar(calendar)
+        self._calendar_date = today
+        self._calendar_backoff.reset()
+
+
+async def _sleep_measuring_lag(delay: float) -> None:
+    due = time.perf_counter() + delay
+    await asyncio.sleep(delay)
+    POLL_LAG_SECONDS.observe(max(0.0, time.perf_counter() - due))
+
+
+async def _broadcast_bar(
+    symbol: str, period: str, bar, indicators: dict | None = None, timeout: float | None = None
+) -> None:
     event = BarEvent(op="bar", symbol=symbol, period=period, bar=bar)
-    payload = event.model_dump()
+    payload = event.model_dump(exclude={"indicators"})
+    # Subscribers asking for the same indicator set share one payload.
+    payloads: dict[tuple[str, ...], dict] = {(): payload}
     for ws in hub.iter_subscribers(symbol, period):
-        await ws.send_json(payload)
+        keys = hub.indicators_for(ws, symbol, period) if indicators else ()
+        message = payloads.get(keys)
+        if message is None:
+            message = {**payload, "indicators": {key: indicators[key] for key in keys if key in indicators}}
+            payloads[keys] = message
+        WS_SENDS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await _send(ws, message, timeout)
+        finally:
+            WS_SENDS_IN_FLIGHT.dec()
+            WS_SEND_SECONDS.observe(time.perf_counter() - started)
 
 
-async def _broadcast_status(message: str, code: str | None = None, level: str = "info") -> None:
+async def _broadcast_status(
+    message: str, code: str | None = None, level: str = "info", timeout: float | None = None
+) -> None:
     event = StatusEvent(op="status", message=message, code=code, level=level)
     payload = event.model_dump()
     for ws in hub.iter_all():
-        await ws.send_json(payload)
-
-
-def _parse_sessions(value: str) -> list[tuple[time, time]]:
-    sessions: list[tuple[time, time]] = []
-    for part in value.split(","):
-        part = part.strip()
-        if not part:
-            continue
-        start_s, end_s = part.split("-")
-        start = _parse_time(start_s)
-        end = _parse_time(end_s)
-        sessions.append((start, end))
-    return sessions
-
-
-def _parse_time(value: str) -> time:
-    hour, minute = value.split(":")
-    return time(int(hour), int(minute))
+        await _send(ws, payload, timeout)
 
 
-def _parse_special_sessions(value: str) -> dict[str, list[tuple[time, time]]]:
-    value = value.strip()
-    if not value:
-        return {}
+async def _send(ws, payload: dict, timeout: float | None = None) -> None:
+    # Fan-out works on a copy of the subscriber list, so a socket may have
+    # been reaped or disconnected since, or stopped reading (a half-open peer
+    # whose send buffer is full); drop it and carry on with the rest.
     try:
-        import json
-
-        raw = json.loads(value)
-    except Exception:
-        logger.warning("invalid special_trading_sessions")
-        return {}
-    sessions: dict[str, list[tuple[time, time]]] = {}
-    for date_str, session_str in raw.items():
-        if not isinstance(session_str, str):
-            continue
-        sessions[date_str] = _parse_sessions(session_str)
-    return sessions
-
-
-def _parse_closed_dates(value: str) -> set[str]:
-    value = value.strip()
-    if not value:
-        return set()
-    return {item.strip() for item in value.split(",") if item.strip()}
+        async with asyncio.timeout(timeout):
+            await ws.send_json(payload)
+    except Exception as exc:
+        logger.debug("dropping websocket after failed send: %s", exc)
+        hub.remove(ws)
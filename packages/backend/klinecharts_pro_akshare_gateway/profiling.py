@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import cProfile
+import itertools
+import marshal
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_current: ContextVar[Trace | None] = ContextVar("klinecharts_trace", default=None)
+_ids = itertools.count(1)
+
+
+@dataclass
+class Trace:
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    ended: float | None = None
+    id: int = field(default_factory=lambda: next(_ids))
+    wall_time: float = field(default_factory=time.time)
+    phases: list[tuple[str, float, float]] = field(default_factory=list)
+
+    def duration(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+
+class Profiler:
+    """Opt-in, sampled phase tracing for history requests and poll cycles.
+
+    Sampled work runs inside ``trace()``; ``phase()`` blocks anywhere below
+    it (including provider calls run in worker threads, which inherit the
+    context) record their start/end. Unsampled work pays one context
+    variable lookup per phase. Optionally a cProfile session on the event
+    loop thread can be captured alongside for pstats output.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._traces: deque[Trace] = deque(maxlen=200)
+        self._cprofile: cProfile.Profile | None = None
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: bool | None = None,
+        sample_rate: float | None = None,
+        max_traces: int | None = None,
+    ) -> None:
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if max_traces is not None and max_traces != self._traces.maxlen:
+            self._traces = deque(self._traces, maxlen=max_traces)
+        if enabled is not None:
+            self.enabled = enabled
+
+    def start_cprofile(self) -> None:
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop_cprofile(self) -> bytes | None:
+        """Stops the cProfile session and returns it in pstats' marshal format."""
+        profile, self._cprofile = self._cprofile, None
+        if profile is None:
+            return None
+        profile.disable()
+        profile.create_stats()
+        return marshal.dumps(profile.stats)
+
+    def status(self) -> dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "max_traces": self._traces.maxlen,
+            "traces": len(self._traces),
+            "cprofile": self._cprofile is not None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+    @contextmanager
+    def trace(self, name: str) -> Iterator[Trace | None]:
+        if not self.enabled or _current.get() is not None or random.random() >= self.sample_rate:
+            yield None
+            return
+        trace = Trace(name)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            trace.ended = time.perf_counter()
+            with self._lock:
+                self._traces.append(trace)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        totals: dict[str, list[float]] = {}
+        with self._lock:
+            traces = list(self._traces)
+        for trace in traces:
+            totals.setdefault(trace.name, []).append(trace.duration())
+            for phase, start, end in trace.phases:
+                totals.setdefault(f"{trace.name}.{phase}", []).append(end - start)
+        return {
+            name: {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+            for name, values in sorted(totals.items())
+        }
+
+    def speedscope(self) -> dict[str, object]:
+        frames: list[dict[str, str]] = []
+        frame_index: dict[str, int] = {}
+        profiles = []
+        with self._lock:
+            traces = list(self._traces)
+        for trace in traces:
+            events: list[dict[str, object]] = []
+            end = trace.duration()
+            _emit(
+                events,
+                frames,
+                frame_index,
+                trace.name,
+                0.0,
+                end,
+                sorted(
+                    ((name, start - trace.started, stop - trace.started) for name, start, stop in trace.phases),
+                    key=lambda item: (item[1], -item[2]),
+                ),
+            )
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": f"{trace.name} #{trace.id} @ {time.strftime('%H:%M:%S', time.localtime(trace.wall_time))}",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": round(end * 1000, 3),
+                    "events": events,
+                }
+            )
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": "klinecharts-pro-akshare-gateway",
+            "exporter": "klinecharts-pro-akshare-gateway",
+        }
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.phases.append((name, started, time.perf_counter()))
+
+
+class ProfilingMiddleware:
+    """Traces sampled requests under ``path_prefix``, recording time spent
+    sending the response as the ``send`` phase."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler, path_prefix: str) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not self.profiler.enabled
+            or scope["type"] != "http"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def timed_send(message: Message) -> None:
+            with phase("send"):
+                await send(message)
+
+        with self.profiler.trace(scope["path"]) as trace:
+            await self.app(scope, receive, timed_send if trace is not None else send)
+
+
+def _emit(events, frames, frame_index, name, start, end, children) -> None:
+    # Phases recorded from other threads may overlap; clamp them into their
+    # parent so the evented profile stays properly nested.
+    frame = frame_index.get(name)
+    if frame is None:
+        frame = frame_index[name] = len(frames)
+        frames.append({"name": name})
+    events.append({"type": "O", "frame": frame, "at": round(start * 1000, 3)})
+    cursor = start
+    index = 0
+    while index < len(children):
+        child_name, child_start, child_end = children[index]
+        index += 1
+        child_start = max(child_start, cursor)
+        child_end = min(child_end, end)
+        if child_end < child_start:
+            continue
+        nested = []
+        while index < len(children) and children[index][1] < child_end:
+            nested.append(children[index])
+            index += 1
+        _emit(events, frames, frame_index, child_name, child_start, child_end, nested)
+        cursor = child_end
+    events.append({"type": "C", "frame": frame, "at": round(end * 1000, 3)})
+
+
+profiler = Profiler()
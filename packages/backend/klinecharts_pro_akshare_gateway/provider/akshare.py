@@ -1,27 +1,57 @@
 from __future__ import annotations
 
-from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import date, datetime
-import io
+from datetime import date, datetime, timedelta
+import sys
+import threading
 from zoneinfo import ZoneInfo
 
-from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache
+from klinecharts_pro_akshare_gateway.cache.refresh import RefreshAheadValue
 from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
+from klinecharts_pro_akshare_gateway.profiling import phase
+from klinecharts_pro_akshare_gateway.provider.base import exchange_from_symbol
+from klinecharts_pro_akshare_gateway.trading_calendar import (
+    DAY_MS,
+    EPOCH_ORDINAL,
+    epoch_ms,
+    fixed_utc_offset_ms,
+)
+
+_TZ = ZoneInfo("Asia/Shanghai")
+# China has not observed DST since 1991, so local wall time converts to
+# epoch ms with one subtraction instead of a zoneinfo lookup per row.
+_UTC_OFFSET_MS = fixed_utc_offset_ms(_TZ)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_ONE_MS = timedelta(milliseconds=1)
 
 
 @dataclass
 class AkshareConfig:
     symbols_ttl_seconds: int = 24 * 60 * 60
     calendar_ttl_seconds: int = 24 * 60 * 60
+    refresh_ahead: float = 0.8
     silent_progress: bool = True
 
 
 class AkshareProvider:
     def __init__(self, config: AkshareConfig | None = None) -> None:
         self._config = config or AkshareConfig()
-        self._symbols_cache = MemoryCache()
-        self._calendar_cache = MemoryCache()
+        self._symbols = RefreshAheadValue(
+            self._fetch_symbols,
+            ttl_seconds=self._config.symbols_ttl_seconds,
+            refresh_ahead=self._config.refresh_ahead,
+            name="akshare-symbols",
+        )
+        self._calendar = RefreshAheadValue(
+            self._fetch_trading_calendar,
+            ttl_seconds=self._config.calendar_ttl_seconds,
+            refresh_ahead=self._config.refresh_ahead,
+            name="akshare-calendar",
+        )
+
+    def warm_up(self) -> None:
+        _import_akshare()
 
     def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
         if not q:
@@ -37,7 +67,7 @@ class AkshareProvider:
 
     def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
         ak = _import_akshare()
-        with _silence(self._config.silent_progress):
+        with phase("upstream"), _silence(self._config.silent_progress):
             df = ak.stock_zh_a_hist(
                 symbol=symbol.split(".", 1)[0],
                 period="daily",
@@ -46,22 +76,21 @@ class AkshareProvider:
                 adjust="",
             )
         bars: list[Bar] = []
-        tz = ZoneInfo("Asia/Shanghai")
-        for _, row in df.iterrows():
-            dt = datetime.strptime(str(row["日期"]), "%Y-%m-%d")
-            dt = dt.replace(tzinfo=tz)
-            bars.append(
-                Bar(
-                    ts=int(dt.timestamp() * 1000),
-                    open=float(row["开盘"]),
-                    high=float(row["最高"]),
-                    low=float(row["最低"]),
-                    close=float(row["收盘"]),
-                    volume=float(row.get("成交量", 0)),
-                    amount=float(row.get("成交额", 0)) if "成交额" in row else None,
-                    is_closed=True,
+        with phase("parse"):
+            for _, row in df.iterrows():
+                day = date.fromisoformat(str(row["日期"])[:10])
+                bars.append(
+                    Bar(
+                        ts=(day.toordinal() - EPOCH_ORDINAL) * DAY_MS - _UTC_OFFSET_MS,
+                        open=float(row["开盘"]),
+                        high=float(row["最高"]),
+                        low=float(row["最低"]),
+                        close=float(row["收盘"]),
+                        volume=float(row.get("成交量", 0)),
+                        amount=float(row.get("成交额", 0)) if "成交额" in row else None,
+                        is_closed=True,
+                    )
                 )
-            )
         return bars
 
     def get_minute_history(
@@ -74,7 +103,7 @@ class AkshareProvider:
         code = symbol.split(".", 1)[0]
         start_s = _to_shanghai(start).strftime("%Y-%m-%d %H:%M:%S")
         end_s = _to_shanghai(end).strftime("%Y-%m-%d %H:%M:%S")
-        with _silence(self._config.silent_progress):
+        with phase("upstream"), _silence(self._config.silent_progress):
             try:
                 df = ak.stock_zh_a_hist_min_em(
                     symbol=code,
@@ -90,60 +119,63 @@ class AkshareProvider:
                     start_date=start_s,
                     end_date=end_s,
                 )
-        tz = ZoneInfo("Asia/Shanghai")
         bars: list[Bar] = []
-        for _, row in df.iterrows():
-            ts_str = _row_get(row, ["时间", "datetime", "时间戳", "time"])
-            if not ts_str:
-                continue
-            dt = _parse_datetime(str(ts_str)).replace(tzinfo=tz)
-            bars.append(
-                Bar(
-                    ts=int(dt.timestamp() * 1000),
-                    open=float(_row_get(row, ["开盘", "open"]) or 0),
-                    high=float(_row_get(row, ["最高", "high"]) or 0),
-                    low=float(_row_get(row, ["最低", "low"]) or 0),
-                    close=float(_row_get(row, ["收盘", "close"]) or 0),
-                    volume=float(_row_get(row, ["成交量", "volume"]) or 0),
-                    amount=float(_row_get(row, ["成交额", "amount"]) or 0),
-                    is_closed=True,
+        with phase("parse"):
+            for _, row in df.iterrows():
+                ts_str = _row_get(row, ["时间", "datetime", "时间戳", "time"])
+                if not ts_str:
+                    continue
+                bars.append(
+                    Bar(
+                        ts=_local_ms(_parse_datetime(str(ts_str))),
+                        open=float(_row_get(row, ["开盘", "open"]) or 0),
+                        high=float(_row_get(row, ["最高", "high"]) or 0),
+                        low=float(_row_get(row, ["最低", "low"]) or 0),
+                        close=float(_row_get(row, ["收盘", "close"]) or 0),
+                        volume=float(_row_get(row, ["成交量", "volume"]) or 0),
+                        amount=float(_row_get(row, ["成交额", "amount"]) or 0),
+                        is_closed=True,
+                    )
                 )
-            )
         return bars
 
-    def get_realtime_snapshot_batch(self, symbols: list[str]) -> dict[str, Snapshot]:
-        if not symbols:
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        if symbols is not None and not symbols:
             return {}
         ak = _import_akshare()
-        with _silence(self._config.silent_progress):
+        with phase("upstream"), _silence(self._config.silent_progress):
             df = ak.stock_zh_a_spot_em()
-        tz = ZoneInfo("Asia/Shanghai")
-        now = datetime.now(tz=tz)
+        now = datetime.now(tz=_TZ)
         out: dict[str, Snapshot] = {}
-        symbol_set = set(symbols)
-        for _, row in df.iterrows():
-            code = str(row.get("代码") or row.get("code") or "").zfill(6)
-            full_symbol = _to_internal_symbol(code)
-            if full_symbol not in symbol_set:
-                continue
-            out[full_symbol] = Snapshot(
-                ts=now,
-                last=float(row.get("最新价", 0)),
-                open=_as_float(row, "今开"),
-                high=_as_float(row, "最高"),
-                low=_as_float(row, "最低"),
-                prev_close=_as_float(row, "昨收"),
-                volume_total=_as_float(row, "成交量"),
-                amount_total=_as_float(row, "成交额"),
-            )
+        symbol_set = set(symbols) if symbols is not None else None
+        with phase("parse"):
+            for _, row in df.iterrows():
+                code = str(row.get("代码") or row.get("code") or "").zfill(6)
+                full_symbol = _to_internal_symbol(code)
+                if symbol_set is not None and full_symbol not in symbol_set:
+                    continue
+                last = _as_float(row, "最新价")
+                if last is None or last != last:
+                    # Suspended symbols have no last price in the spot table.
+                    continue
+                out[full_symbol] = Snapshot(
+                    ts=now,
+                    last=last,
+                    open=_as_float(row, "今开"),
+                    high=_as_float(row, "最高"),
+                    low=_as_float(row, "最低"),
+                    prev_close=_as_float(row, "昨收"),
+                    volume_total=_as_float(row, "成交量"),
+                    amount_total=_as_float(row, "成交额"),
+                )
         return out
 
     def get_trading_calendar(self) -> set[str]:
-        cached = self._calendar_cache.get("trading_calendar")
-        if cached is not None:
-            return cached
+        return self._calendar.get()
+
+    def _fetch_trading_calendar(self) -> set[str]:
         ak = _import_akshare()
-        with _silence(self._config.silent_progress):
+        with phase("upstream"), _silence(self._config.silent_progress):
             df = ak.tool_trade_date_hist_sina()
         dates: set[str] = set()
         for _, row in df.iterrows():
@@ -151,17 +183,14 @@ class AkshareProvider:
             if not value:
                 continue
             dates.add(str(value))
-        self._calendar_cache.set(
-            "trading_calendar", dates, ttl_seconds=self._config.calendar_ttl_seconds
-        )
         return dates
 
     def _load_symbols(self) -> list[SymbolInfo]:
-        cached = self._symbols_cache.get("symbols")
-        if cached is not None:
-            return cached
+        return self._symbols.get()
+
+    def _fetch_symbols(self) -> list[SymbolInfo]:
         ak = _import_akshare()
-        with _silence(self._config.silent_progress):
+        with phase("upstream"), _silence(self._config.silent_progress):
             df = ak.stock_info_a_code_name()
         items: list[SymbolInfo] = []
         for _, row in df.iterrows():
@@ -172,15 +201,12 @@ class AkshareProvider:
                 SymbolInfo(
                     symbol=symbol,
                     name=name,
-                    exchange=_exchange_from_symbol(symbol),
+                    exchange=exchange_from_symbol(symbol),
                     type="stock",
                     currency="CNY",
                     timezone="Asia/Shanghai",
                 )
             )
-        self._symbols_cache.set(
-            "symbols", items, ttl_seconds=self._config.symbols_ttl_seconds
-        )
         return items
 
 
@@ -202,16 +228,6 @@ def _to_internal_symbol(code: str) -> str:
     return f"{code}.SZ"
 
 
-def _exchange_from_symbol(symbol: str) -> str:
-    if symbol.endswith(".SH"):
-        return "SSE"
-    if symbol.endswith(".SZ"):
-        return "SZSE"
-    if symbol.endswith(".BJ"):
-        return "BSE"
-    return ""
-
-
 def _to_akshare_symbol(symbol: str) -> str:
     code, suffix = symbol.split(".", 1)
     suffix = suffix.lower()
@@ -228,15 +244,58 @@ def _as_float(row, key: str) -> float | None:
         return None
 
 
+_silenced = threading.local()
+_install_lock = threading.Lock()
+
+
+class _ThreadSilencedStream:
+    """Proxy for sys.stdout/sys.stderr that drops writes from silenced threads.
+
+    Installed once for the whole process; each thread opts in through
+    ``_silence``, so concurrent AKShare calls never swap the global streams.
+    """
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+
+    def write(self, data: str) -> int:
+        if getattr(_silenced, "active", False):
+            return len(data)
+        return self._stream.write(data)
+
+    def flush(self) -> None:
+        if getattr(_silenced, "active", False):
+            return
+        self._stream.flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+
+def _install_stream_proxies() -> None:
+    if isinstance(sys.stdout, _ThreadSilencedStream) and isinstance(
+        sys.stderr, _ThreadSilencedStream
+    ):
+        return
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadSilencedStream):
+            sys.stdout = _ThreadSilencedStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadSilencedStream):
+            sys.stderr = _ThreadSilencedStream(sys.stderr)
+
+
 @contextmanager
 def _silence(enabled: bool):
     if not enabled:
         yield
         return
-    stdout = io.StringIO()
-    stderr = io.StringIO()
-    with redirect_stdout(stdout), redirect_stderr(stderr):
+    _install_stream_proxies()
+    previous = getattr(_silenced, "active", False)
+    _silenced.active = True
+    try:
         yield
+    finally:
+        _silenced.active = previous
 
 
 def _row_get(row, keys: list[str]):
@@ -251,16 +310,17 @@ def _row_get(row, keys: list[str]):
 
 
 def _parse_datetime(value: str) -> datetime:
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-        try:
-            return datetime.strptime(value, fmt)
-        except ValueError:
-            continue
+    # Covers "%Y-%m-%d %H:%M[:%S]" at a fraction of strptime's cost.
     return datetime.fromisoformat(value)
 
 
+def _local_ms(value: datetime) -> int:
+    if value.tzinfo is not None:
+        return epoch_ms(value)
+    return (value - _EPOCH_NAIVE) // _ONE_MS - _UTC_OFFSET_MS
+
+
 def _to_shanghai(value: datetime) -> datetime:
-    tz = ZoneInfo("Asia/Shanghai")
     if value.tzinfo is None:
-        return value.replace(tzinfo=tz)
-    return value.astimezone(tz)
+        return value.replace(tzinfo=_TZ)
+    return value.astimezone(_TZ)
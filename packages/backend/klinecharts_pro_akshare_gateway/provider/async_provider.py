@@ -1,32 +1,105 @@
 from __future__ import annotations
 
+import time
 from datetime import date, datetime
 
 import anyio
 
+from klinecharts_pro_akshare_gateway.metrics import PROVIDER_QUEUE_TIMEOUTS, PROVIDER_QUEUE_WAIT_SECONDS
 from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
 from klinecharts_pro_akshare_gateway.provider.base import MarketDataProvider
 
 
+class ProviderBusyError(RuntimeError):
+    pass
+
+
+class _CallPool:
+    def __init__(self, name: str, capacity: int, queue_timeout_seconds: float | None) -> None:
+        self.name = name
+        self.capacity = capacity
+        self._queue_timeout = queue_timeout_seconds or None
+        # Admission is tracked separately from the thread limiter so that
+        # queue waits can time out without holding a worker thread.
+        self._admission = anyio.CapacityLimiter(capacity)
+        self._threads = anyio.CapacityLimiter(capacity)
+        self.waiting = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def run(self, func, *args):
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            with anyio.fail_after(self._queue_timeout):
+                await self._admission.acquire()
+        except TimeoutError:
+            self.timeouts += 1
+            PROVIDER_QUEUE_TIMEOUTS.inc(self.name)
+            raise ProviderBusyError(f"{self.name} provider pool is busy") from None
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self.calls += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        PROVIDER_QUEUE_WAIT_SECONDS.observe(waited, self.name)
+        try:
+            return await anyio.to_thread.run_sync(func, *args, limiter=self._threads)
+        finally:
+            self._admission.release()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self._admission.borrowed_tokens,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
 class AsyncProvider:
-    def __init__(self, provider: MarketDataProvider) -> None:
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        snapshot_concurrency: int = 1,
+        history_concurrency: int = 4,
+        metadata_concurrency: int = 2,
+        queue_timeout_seconds: float | None = 10.0,
+    ) -> None:
         self._provider = provider
+        self._snapshot = _CallPool("snapshot", snapshot_concurrency, queue_timeout_seconds)
+        self._history = _CallPool("history", history_concurrency, queue_timeout_seconds)
+        self._metadata = _CallPool("metadata", metadata_concurrency, queue_timeout_seconds)
+
+    async def warm_up(self) -> None:
+        warm_up = getattr(self._provider, "warm_up", None)
+        if warm_up is not None:
+            await self._metadata.run(warm_up)
 
     async def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
-        return await anyio.to_thread.run_sync(self._provider.search_symbols, q, limit)
+        return await self._metadata.run(self._provider.search_symbols, q, limit)
 
     async def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
-        return await anyio.to_thread.run_sync(self._provider.get_daily_history, symbol, start, end)
+        return await self._history.run(self._provider.get_daily_history, symbol, start, end)
 
     async def get_minute_history(
         self, symbol: str, period: str, start: datetime, end: datetime
     ) -> list[Bar]:
-        return await anyio.to_thread.run_sync(
+        return await self._history.run(
             self._provider.get_minute_history, symbol, period, start, end
         )
 
-    async def get_realtime_snapshot_batch(self, symbols: list[str]) -> dict[str, Snapshot]:
-        return await anyio.to_thread.run_sync(self._provider.get_realtime_snapshot_batch, symbols)
+    async def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        return await self._snapshot.run(self._provider.get_realtime_snapshot_batch, symbols)
 
     async def get_trading_calendar(self) -> set[str]:
-        return await anyio.to_thread.run_sync(self._provider.get_trading_calendar)
+        return await self._metadata.run(self._provider.get_trading_calendar)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {pool.name: pool.stats() for pool in (self._snapshot, self._history, self._metadata)}
@@ -18,8 +18,17 @@ class MarketDataProvider(Protocol):
     ) -> list[Bar]:
         ...
 
-    def get_realtime_snapshot_batch(self, symbols: list[str]) -> dict[str, Snapshot]:
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        """Snapshots for ``symbols``, or for the whole market when None."""
         ...
 
     def get_trading_calendar(self) -> set[str]:
         ...
+
+
+_EXCHANGES = {"SH": "SSE", "SZ": "SZSE", "BJ": "BSE"}
+
+
+def exchange_from_symbol(symbol: str) -> str:
+    """Exchange code reported in ``SymbolInfo.exchange`` for a ``CODE.SUFFIX`` symbol."""
+    return _EXCHANGES.get(symbol.rpartition(".")[2], "")
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import BrokenExecutor
+from datetime import date, datetime
+
+from klinecharts_pro_akshare_gateway.metrics import UPSTREAM_SECONDS
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
+from klinecharts_pro_akshare_gateway.provider.base import MarketDataProvider
+
+# Only transport-level failures (network errors and timeouts, which requests
+# raises as OSError subclasses, or a broken worker pool) count towards opening
+# a circuit. Errors specific to one request, such as an unknown symbol or an
+# empty or unparsable result, must not let a few bad requests fail everyone.
+_UPSTREAM_ERRORS: tuple[type[BaseException], ...] = (OSError, BrokenExecutor)
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(f"{endpoint} circuit is open")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self._opened_at + self.reset_timeout_seconds - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(self.name, max(remaining, 0.0) or self.reset_timeout_seconds)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_ignored(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout_seconds - time.monotonic())
+
+
+class CircuitBreakerProvider(MarketDataProvider):
+    """Fails fast per upstream endpoint after repeated errors.
+
+    After ``failure_threshold`` consecutive upstream failures (network
+    errors, timeouts or a broken worker pool) an endpoint's circuit opens and calls raise ``CircuitOpenError`` without reaching the wrapped
+    provider; after ``reset_timeout_seconds`` one trial call is let through.
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30.0,
+    ) -> None:
+        self._provider = provider
+        self._breakers = {
+            name: CircuitBreaker(name, failure_threshold, reset_timeout_seconds)
+            for name in (
+                "search_symbols",
+                "get_daily_history",
+                "get_minute_history",
+                "get_realtime_snapshot_batch",
+                "get_trading_calendar",
+            )
+        }
+
+    def warm_up(self) -> None:
+        warm_up = getattr(self._provider, "warm_up", None)
+        if warm_up is not None:
+            warm_up()
+
+    def shutdown(self) -> None:
+        shutdown = getattr(self._provider, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {
+            name: {
+                "state": breaker.state,
+                "failures": breaker.failures,
+                "retry_after": round(breaker.retry_after(), 3),
+            }
+            for name, breaker in self._breakers.items()
+        }
+
+    def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
+        return self._call("search_symbols", q, limit)
+
+    def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
+        return self._call("get_daily_history", symbol, start, end)
+
+    def get_minute_history(
+        self, symbol: str, period: str, start: datetime, end: datetime
+    ) -> list[Bar]:
+        return self._call("get_minute_history", symbol, period, start, end)
+
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        return self._call("get_realtime_snapshot_batch", symbols)
+
+    def get_trading_calendar(self) -> set[str]:
+        return self._call("get_trading_calendar")
+
+    def _call(self, name: str, *args):
+        breaker = self._breakers[name]
+        breaker.before_call()
+        started = time.perf_counter()
+        try:
+            result = getattr(self._provider, name)(*args)
+        except NotImplementedError:
+            breaker.record_success()
+            raise
+        except _UPSTREAM_ERRORS:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, name, "error")
+            breaker.record_failure()
+            raise
+        except Exception:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, name, "invalid")
+            breaker.record_ignored()
+            raise
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, name, "ok")
+        breaker.record_success()
+        return result
@@ -10,6 +10,8 @@ class CustomProvider(MarketDataProvider):
     """Example provider template.
 
     Replace the method bodies with your own data source implementation.
+    ``Bar`` is a plain dataclass and is not validated: pass ``ts`` as UTC
+    milliseconds and prices/volumes as Python floats.
     """
 
     def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
@@ -23,7 +25,7 @@ class CustomProvider(MarketDataProvider):
     ) -> list[Bar]:
         return []
 
-    def get_realtime_snapshot_batch(self, symbols: list[str]) -> dict[str, Snapshot]:
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
         return {}
 
     def get_trading_calendar(self) -> set[str]:
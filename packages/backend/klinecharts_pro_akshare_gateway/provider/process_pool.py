@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Callable
+
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
+from klinecharts_pro_akshare_gateway.provider.base import MarketDataProvider
+
+_worker_provider: MarketDataProvider | None = None
+
+
+class ProcessPoolProvider(MarketDataProvider):
+    """Runs a provider in warm worker processes.
+
+    ``factory`` must be picklable (a class, a module-level function or a
+    ``functools.partial`` of one); each worker builds its own provider once
+    and calls ``warm_up()`` on it if present. Results cross the process
+    boundary as plain column lists and are rebuilt into models here.
+    """
+
+    def __init__(self, factory: Callable[[], MarketDataProvider], workers: int = 2) -> None:
+        self._workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(factory,),
+        )
+
+    def warm_up(self) -> None:
+        futures = [self._executor.submit(_ping) for _ in range(self._workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
+        rows = self._executor.submit(_search_symbols, q, limit).result()
+        return [
+            SymbolInfo(
+                symbol=symbol,
+                name=name,
+                exchange=exchange,
+                type=type_,
+                currency=currency,
+                timezone=tz_name,
+            )
+            for symbol, name, exchange, type_, currency, tz_name in rows
+        ]
+
+    def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
+        return _bars_from_columns(
+            self._executor.submit(_get_daily_history, symbol, start, end).result()
+        )
+
+    def get_minute_history(
+        self, symbol: str, period: str, start: datetime, end: datetime
+    ) -> list[Bar]:
+        return _bars_from_columns(
+            self._executor.submit(_get_minute_history, symbol, period, start, end).result()
+        )
+
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        ts_ms, rows = self._executor.submit(_get_realtime_snapshot_batch, symbols).result()
+        ts = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+        return {
+            symbol: Snapshot(
+                ts=ts,
+                last=last,
+                open=open_,
+                high=high,
+                low=low,
+                prev_close=prev_close,
+                volume_total=volume_total,
+                amount_total=amount_total,
+            )
+            for symbol, last, open_, high, low, prev_close, volume_total, amount_total in rows
+        }
+
+    def get_trading_calendar(self) -> set[str]:
+        return set(self._executor.submit(_get_trading_calendar).result())
+
+
+def _init_worker(factory: Callable[[], MarketDataProvider]) -> None:
+    global _worker_provider
+    _worker_provider = factory()
+    warm_up = getattr(_worker_provider, "warm_up", None)
+    if warm_up is not None:
+        warm_up()
+
+
+def _ping() -> bool:
+    return _worker_provider is not None
+
+
+def _search_symbols(q: str, limit: int) -> list[tuple]:
+    return [
+        (item.symbol, item.name, item.exchange, item.type, item.currency, item.timezone)
+        for item in _worker_provider.search_symbols(q, limit)
+    ]
+
+
+def _get_daily_history(symbol: str, start: date, end: date) -> tuple[list, ...]:
+    return _bars_to_columns(_worker_provider.get_daily_history(symbol, start, end))
+
+
+def _get_minute_history(symbol: str, period: str, start: datetime, end: datetime) -> tuple[list, ...]:
+    return _bars_to_columns(_worker_provider.get_minute_history(symbol, period, start, end))
+
+
+def _get_realtime_snapshot_batch(symbols: list[str] | None) -> tuple[int, list[tuple]]:
+    snapshots = _worker_provider.get_realtime_snapshot_batch(symbols)
+    ts_ms = 0
+    rows = []
+    for symbol, snap in snapshots.items():
+        ts_ms = int(snap.ts.timestamp() * 1000)
+        rows.append(
+            (
+                symbol,
+                snap.last,
+                snap.open,
+                snap.high,
+                snap.low,
+                snap.prev_close,
+                snap.volume_total,
+                snap.amount_total,
+            )
+        )
+    return ts_ms, rows
+
+
+def _get_trading_calendar() -> list[str]:
+    return list(_worker_provider.get_trading_calendar())
+
+
+def _bars_to_columns(bars: list[Bar]) -> tuple[list, ...]:
+    return (
+        [bar.ts for bar in bars],
+        [bar.open for bar in bars],
+        [bar.high for bar in bars],
+        [bar.low for bar in bars],
+        [bar.close for bar in bars],
+        [bar.volume for bar in bars],
+        [bar.amount for bar in bars],
+        [bar.is_closed for bar in bars],
+    )
+
+
+def _bars_from_columns(columns: tuple[list, ...]) -> list[Bar]:
+    return [
+        Bar(
+            ts=ts,
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            amount=amount,
+            is_closed=is_closed,
+        )
+        for ts, open_, high, low, close, volume, amount, is_closed in zip(*columns)
+    ]
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterator
+from zoneinfo import ZoneInfo
+
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
+from klinecharts_pro_akshare_gateway.provider.base import MarketDataProvider
+
+logger = logging.getLogger(__name__)
+
+# One JSON line per snapshot batch:
+#   {"ts": <batch ts ms>, "rows": [[symbol, last, open, high, low, prev_close,
+#                                   volume_total, amount_total, ts_ms | null], ...]}
+# The per-row ts is null when it equals the batch ts (the AKShare case).
+
+
+class SnapshotRecorder:
+    """Appends snapshot batches to a JSONL recording."""
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def append(self, snapshots: dict[str, Snapshot]) -> None:
+        if not snapshots:
+            return
+        batch_ts = min(_ms(snap.ts) for snap in snapshots.values())
+        rows = []
+        for symbol, snap in snapshots.items():
+            ts = _ms(snap.ts)
+            rows.append(
+                [
+                    symbol,
+                    snap.last,
+                    snap.open,
+                    snap.high,
+                    snap.low,
+                    snap.prev_close,
+                    snap.volume_total,
+                    snap.amount_total,
+                    None if ts == batch_ts else ts,
+                ]
+            )
+        line = json.dumps({"ts": batch_ts, "rows": rows}, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self._file = self._path.open("a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path: str | Path) -> Iterator[tuple[int, dict[str, Snapshot]]]:
+    with Path(path).open(encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            payload = json.loads(line)
+            batch_ts = payload["ts"]
+            batch_dt = _dt(batch_ts)
+            snapshots = {}
+            for symbol, last, open_, high, low, prev_close, volume, amount, ts in payload["rows"]:
+                snapshots[symbol] = Snapshot(
+                    ts=batch_dt if ts is None else _dt(ts),
+                    last=last,
+                    open=open_,
+                    high=high,
+                    low=low,
+                    prev_close=prev_close,
+                    volume_total=volume,
+                    amount_total=amount,
+                )
+            yield batch_ts, snapshots
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves a recorded snapshot stream back, one batch per call.
+
+    With ``speed > 0`` a batch is not returned before its recorded offset
+    from the first batch, divided by ``speed``, has elapsed (1 = real time,
+    100 = a full session in under three minutes); ``speed = 0`` replays as
+    fast as it is polled. Once the recording is exhausted snapshot calls
+    return ``{}``. Everything else goes to ``fallback`` when given; without
+    one searches and history are empty and no trading calendar is reported,
+    so the clock keeps its built-in weekday calendar.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        speed: float = 1.0,
+        fallback: MarketDataProvider | None = None,
+        tz_name: str = "Asia/Shanghai",
+    ) -> None:
+        self._path = Path(path)
+        self._speed = speed
+        self._fallback = fallback
+        self._tz = ZoneInfo(tz_name)
+        self._frames = read_recording(self._path)
+        self._origin: tuple[float, int] | None = None
+        self._lock = threading.Lock()
+        self.frames_served = 0
+        self.exhausted = False
+
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        with self._lock:
+            frame = next(self._frames, None)
+            if frame is None:
+                if not self.exhausted:
+                    logger.info("replay of %s finished after %s batches", self._path, self.frames_served)
+                self.exhausted = True
+                return {}
+            ts_ms, snapshots = frame
+            if self._origin is None:
+                self._origin = (time.monotonic(), ts_ms)
+            self.frames_served += 1
+        if self._speed > 0:
+            started, origin_ms = self._origin
+            delay = started + (ts_ms - origin_ms) / 1000 / self._speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if symbols is None:
+            return snapshots
+        return {symbol: snapshots[symbol] for symbol in symbols if symbol in snapshots}
+
+    def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
+        if self._fallback is None:
+            return []
+        return self._fallback.search_symbols(q, limit)
+
+    def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
+        if self._fallback is None:
+            return []
+        return self._fallback.get_daily_history(symbol, start, end)
+
+    def get_minute_history(
+        self, symbol: str, period: str, start: datetime, end: datetime
+    ) -> list[Bar]:
+        if self._fallback is None:
+            return []
+        return self._fallback.get_minute_history(symbol, period, start, end)
+
+    def get_trading_calendar(self) -> set[str]:
+        # The recorded days are only a sample of the calendar, so they are
+        # never reported as the whole of it.
+        if self._fallback is None:
+            return set()
+        return self._fallback.get_trading_calendar()
+
+
+def _ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _dt(ts_ms: int) -> datetime:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from klinecharts_pro_akshare_gateway.barbuilder.buckets import SessionBuckets, aggregate_bars
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot, SymbolInfo
+from klinecharts_pro_akshare_gateway.provider.base import MarketDataProvider, exchange_from_symbol
+from klinecharts_pro_akshare_gateway.trading_calendar import MINUTE_MS, TradingClock, epoch_ms
+
+
+@dataclass
+class SyntheticConfig:
+    seed: int = 7
+    universe_size: int = 5000
+    # Simulated upstream latency per call, in seconds.
+    history_latency: float = 0.0
+    snapshot_latency: float = 0.0
+    metadata_latency: float = 0.0
+    timezone: str = "Asia/Shanghai"
+    trading_sessions: str = "09:30-11:30,13:00-15:00"
+    calendar_start: date = date(2015, 1, 1)
+    calendar_end: date = date(2030, 12, 31)
+    # When set, snapshot frames are stamped start + n * tick_seconds instead
+    # of wall-clock time, so replays land inside trading sessions.
+    snapshot_start: datetime | None = None
+    tick_seconds: float = 3.0
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic stand-in for AKShare used by benchmarks and load tests.
+
+    Every value is derived from ``seed``, the symbol and the bar's date (or
+    the snapshot frame number), so the same request always yields the same
+    bars no matter how the range is sliced. Snapshot calls build a frame for
+    the whole universe and then filter it, like ``stock_zh_a_spot_em``.
+    """
+
+    def __init__(self, config: SyntheticConfig | None = None) -> None:
+        self._config = config or SyntheticConfig()
+        self._clock = TradingClock(self._config.timezone, self._config.trading_sessions, {}, set())
+        self._buckets = SessionBuckets(self._clock)
+        self._symbols = [_symbol_at(index) for index in range(self._config.universe_size)]
+        self._base_prices = {symbol: self._base_price(symbol) for symbol in self._symbols}
+        self._frame = 0
+        calendar = {
+            day.isoformat()
+            for day in _weekdays(self._config.calendar_start, self._config.calendar_end)
+        }
+        self._calendar = calendar
+        self._clock.update_calendar(calendar)
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def search_symbols(self, q: str, limit: int) -> list[SymbolInfo]:
+        self._sleep(self._config.metadata_latency)
+        if not q:
+            return []
+        items = []
+        for symbol in self._symbols:
+            if q.lower() in symbol.lower():
+                items.append(
+                    SymbolInfo(
+                        symbol=symbol,
+                        name=f"SYN{symbol[:6]}",
+                        exchange=exchange_from_symbol(symbol),
+                        type="stock",
+                    )
+                )
+                if len(items) >= limit:
+                    break
+        return items
+
+    def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
+        self._sleep(self._config.history_latency)
+        tz = self._clock.tz
+        bars = []
+        for day in self._clock.trading_days(start, end):
+            open_, high, low, close, volume = self._daily_ohlcv(symbol, day)
+            ts = int(datetime.combine(day, datetime.min.time(), tzinfo=tz).timestamp() * 1000)
+            bars.append(
+                Bar(
+                    ts=ts,
+                    open=open_,
+                    high=high,
+                    low=low,
+                    close=close,
+                    volume=volume,
+                    amount=round(volume * close * 100, 2),
+                    is_closed=True,
+                )
+            )
+        return bars
+
+    def get_minute_history(
+        self, symbol: str, period: str, start: datetime, end: datetime
+    ) -> list[Bar]:
+        if not period.endswith("m"):
+            raise ValueError("minute period expected")
+        self._sleep(self._config.history_latency)
+        start_ms = int(start.timestamp() * 1000)
+        end_ms = int(end.timestamp() * 1000)
+        tz = self._clock.tz
+        bars: list[Bar] = []
+        for day in self._clock.trading_days(start.astimezone(tz).date(), end.astimezone(tz).date()):
+            bars.extend(self._minute_bars(symbol, day))
+        if period != "1m":
+            bars = aggregate_bars(bars, period, self._buckets)
+        return [bar for bar in bars if start_ms <= bar.ts <= end_ms]
+
+    def get_realtime_snapshot_batch(self, symbols: list[str] | None) -> dict[str, Snapshot]:
+        self._sleep(self._config.snapshot_latency)
+        frame = self._frame
+        self._frame += 1
+        if self._config.snapshot_start is not None:
+            ts = self._config.snapshot_start + timedelta(seconds=frame * self._config.tick_seconds)
+        else:
+            ts = datetime.now(tz=self._clock.tz)
+        rng = random.Random(self._config.seed * 1_000_003 + frame)
+        wanted = set(symbols) if symbols is not None else None
+        out: dict[str, Snapshot] = {}
+        for index, symbol in enumerate(self._symbols):
+            base = self._base_prices[symbol]
+            drift = (rng.random() - 0.5) * 0.002 * (frame + 1) ** 0.5
+            last = round(base * (1 + drift), 2)
+            volume_total = float((frame + 1) * (100 + index % 900))
+            snap = Snapshot(
+                ts=ts,
+                last=last,
+                open=base,
+                high=round(max(base, last) * 1.001, 2),
+                low=round(min(base, last) * 0.999, 2),
+                prev_close=base,
+                volume_total=volume_total,
+                amount_total=round(volume_total * last * 100, 2),
+            )
+            if wanted is None or symbol in wanted:
+                out[symbol] = snap
+        return out
+
+    def get_trading_calendar(self) -> set[str]:
+        self._sleep(self._config.metadata_latency)
+        return set(self._calendar)
+
+    def _base_price(self, symbol: str) -> float:
+        return round(5 + self._unit(symbol, "base") * 195, 2)
+
+    def _daily_ohlcv(self, symbol: str, day: date) -> tuple[float, float, float, float, float]:
+        rng = self._rng(symbol, day.isoformat())
+        # Walk from the symbol's base price with a slow, date-derived drift
+        # so adjacent days look continuous without depending on each other.
+        base = self._base_prices.get(symbol) or self._base_price(symbol)
+        trend = 1 + 0.25 * math.sin(day.toordinal() / 90 + self._unit(symbol, "phase") * math.tau)
+        open_ = round(base * trend, 2)
+        close = round(open_ * (1 + rng.gauss(0, 0.015)), 2)
+        high = round(max(open_, close) * (1 + abs(rng.gauss(0, 0.006))), 2)
+        low = round(min(open_, close) * (1 - abs(rng.gauss(0, 0.006))), 2)
+        volume = float(int(rng.uniform(2e4, 2e6)))
+        return open_, high, low, close, volume
+
+    def _minute_bars(self, symbol: str, day: date) -> list[Bar]:
+        open_, _, _, close, volume = self._daily_ohlcv(symbol, day)
+        rng = self._rng(symbol, f"{day.isoformat()}:1m")
+        bounds = self._clock.session_bounds(day)
+        minutes = sum(int((end - start).total_seconds() // 60) for start, end in bounds)
+        step = (close - open_) / max(minutes, 1)
+        price = open_
+        bars = []
+        for start, end in bounds:
+            for ts in range(epoch_ms(start), epoch_ms(end), MINUTE_MS):
+                next_price = round(price + step + rng.gauss(0, open_ * 0.0008), 2)
+                bars.append(
+                    Bar(
+                        ts=ts,
+                        open=price,
+                        high=round(max(price, next_price) + abs(rng.gauss(0, open_ * 0.0003)), 2),
+                        low=round(min(price, next_price) - abs(rng.gauss(0, open_ * 0.0003)), 2),
+                        close=next_price,
+                        volume=float(int(volume / minutes * rng.uniform(0.5, 1.5))),
+                        amount=None,
+                        is_closed=True,
+                    )
+                )
+                price = next_price
+        return bars
+
+    def _rng(self, symbol: str, key: str) -> random.Random:
+        digest = hashlib.blake2b(f"{self._config.seed}:{symbol}:{key}".encode(), digest_size=8)
+        return random.Random(int.from_bytes(digest.digest(), "big"))
+
+    def _unit(self, symbol: str, key: str) -> float:
+        return self._rng(symbol, key).random()
+
+    @staticmethod
+    def _sleep(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+def _symbol_at(index: int) -> str:
+    if index % 2 == 0:
+        return f"{600000 + index // 2:06d}.SH"
+    return f"{1 + index // 2:06d}.SZ"
+
+
+def _weekdays(start: date, end: date):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
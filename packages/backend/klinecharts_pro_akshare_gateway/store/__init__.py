@@ -0,0 +1 @@
+"""Local persistence for bars built by the gateway."""
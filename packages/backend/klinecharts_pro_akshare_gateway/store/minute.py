@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from klinecharts_pro_akshare_gateway.models import Bar
+from klinecharts_pro_akshare_gateway.trading_calendar import DAY_MS, EPOCH_ORDINAL, fixed_utc_offset_ms
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS minute_bars (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    amount REAL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS minute_days (
+    symbol TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    PRIMARY KEY (symbol, day)
+) WITHOUT ROWID;
+"""
+
+
+class MinuteBarStore:
+    """Closed 1m bars in a local SQLite file, keyed by (symbol, ts).
+
+    ``minute_days`` records which trading days hold bars for a symbol and is
+    mirrored in memory, so the history path can skip the database for the
+    common case of a day the gateway never watched.
+    """
+
+    def __init__(self, path: str | Path, tz_name: str = "Asia/Shanghai") -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._tz = ZoneInfo(tz_name)
+        self._offset_ms = fixed_utc_offset_ms(self._tz)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._days = set(self._conn.execute("SELECT symbol, day FROM minute_days"))
+
+    @property
+    def tz(self) -> ZoneInfo:
+        return self._tz
+
+    def has_day(self, symbol: str, day: date) -> bool:
+        return (symbol, day.toordinal()) in self._days
+
+    def write(self, rows: list[tuple[str, Bar]]) -> None:
+        if not rows:
+            return
+        days = {(symbol, self.day_of(bar.ts)) for symbol, bar in rows}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO minute_bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (symbol, bar.ts, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.amount)
+                    for symbol, bar in rows
+                ],
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO minute_days VALUES (?, ?)", days)
+        self._days.update(days)
+
+    def bars(self, symbol: str, start_ms: int, end_ms: int) -> list[Bar]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, open, high, low, close, volume, amount FROM minute_bars"
+                " WHERE symbol = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (symbol, start_ms, end_ms),
+            ).fetchall()
+        return [
+            Bar(ts=ts, open=o, high=h, low=lo, close=c, volume=v, amount=a, is_closed=True)
+            for ts, o, h, lo, c, v, a in rows
+        ]
+
+    def prune(self, before: date) -> int:
+        cutoff_ms = int(datetime.combine(before, datetime.min.time(), tzinfo=self._tz).timestamp() * 1000)
+        with self._lock, self._conn:
+            deleted = self._conn.execute("DELETE FROM minute_bars WHERE ts < ?", (cutoff_ms,)).rowcount
+            self._conn.execute("DELETE FROM minute_days WHERE day < ?", (before.toordinal(),))
+        self._days = {item for item in self._days if item[1] >= before.toordinal()}
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def day_of(self, ts_ms: int) -> int:
+        """Local date ordinal of ``ts_ms``."""
+        if self._offset_ms is not None:
+            return (ts_ms + self._offset_ms) // DAY_MS + EPOCH_ORDINAL
+        return datetime.fromtimestamp(ts_ms / 1000, tz=self._tz).date().toordinal()
+
+
+class MinuteBarWriter:
+    """Batches closed 1m bars from the poller into a ``MinuteBarStore``.
+
+    ``add`` only appends to a buffer; a background task flushes it every
+    ``flush_interval`` seconds, or sooner once ``batch_size`` bars are
+    waiting, in a worker thread, and drops days older than
+    ``retention_days`` once a day. Reads go through the writer so that bars
+    still waiting for a flush are visible to history requests.
+    """
+
+    def __init__(
+        self,
+        store: MinuteBarStore,
+        flush_interval: float = 5.0,
+        batch_size: int = 2000,
+        retention_days: int = 30,
+    ) -> None:
+        self.store = store
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._retention_days = retention_days
+        self._pruned_on: date | None = None
+        self._buffer: list[tuple[str, Bar]] = []
+        self._flushing: list[tuple[str, Bar]] = []
+        # (symbol, day ordinal) of the bars in each list, so has_day is O(1).
+        self._buffer_days: set[tuple[str, int]] = set()
+        self._flushing_days: set[tuple[str, int]] = set()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.written = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self.store.close()
+
+    def add(self, symbol: str, bar: Bar) -> None:
+        self._buffer.append((symbol, bar))
+        self._buffer_days.add((symbol, self.store.day_of(bar.ts)))
+        if len(self._buffer) >= self._batch_size:
+            self._wake.set()
+
+    def has_day(self, symbol: str, day: date) -> bool:
+        key = (symbol, day.toordinal())
+        return key in self._buffer_days or key in self._flushing_days or self.store.has_day(symbol, day)
+
+    def bars(self, symbol: str, start_ms: int, end_ms: int) -> list[Bar]:
+        """Stored plus not-yet-flushed bars in ``[start_ms, end_ms]``, by ts.
+        Blocking; call from a worker thread."""
+        pending = {
+            bar.ts: bar
+            for item_symbol, bar in (*self._flushing, *self._buffer)
+            if item_symbol == symbol and start_ms <= bar.ts <= end_ms
+        }
+        bars = self.store.bars(symbol, start_ms, end_ms)
+        if not pending:
+            return bars
+        merged = {bar.ts: bar for bar in bars}
+        merged.update(pending)
+        return [merged[ts] for ts in sorted(merged)]
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        self._flushing, self._buffer = self._buffer, []
+        self._flushing_days, self._buffer_days = self._buffer_days, set()
+        try:
+            await asyncio.to_thread(self.store.write, self._flushing)
+            self.written += len(self._flushing)
+        except Exception:
+            logger.exception("minute bar store write failed; dropping %s bars", len(self._flushing))
+        finally:
+            self._flushing = []
+            self._flushing_days = set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            await self._prune()
+
+    async def _prune(self) -> None:
+        today = datetime.now(self.store.tz).date()
+        if self._pruned_on == today:
+            return
+        self._pruned_on = today
+        try:
+            deleted = await asyncio.to_thread(self.store.prune, today - timedelta(days=self._retention_days))
+        except Exception:
+            logger.exception("minute bar store prune failed")
+        else:
+            if deleted:
+                logger.info("pruned %s stored minute bars", deleted)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable
+from zoneinfo import ZoneInfo
+
+from klinecharts_pro_akshare_gateway.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Session bounds as seconds since local midnight, both inclusive.
+Session = tuple[int, int]
+
+_FALLBACK_SCAN_DAYS = 31
+
+DAY_MS = 86_400_000
+MINUTE_MS = 60_000
+# date.toordinal() of 1970-01-01, so epoch day numbers and ordinals convert by addition.
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def epoch_ms(value: datetime) -> int:
+    """Exact epoch milliseconds of an aware datetime (no float rounding)."""
+    return (value - _EPOCH) // _ONE_MS
+
+
+def fixed_utc_offset_ms(tz: ZoneInfo, first_year: int = 1992, last_year: int = 2060) -> int | None:
+    """The zone's UTC offset if it is the same in every January and July of
+    the range, else None (the zone observes DST or changed its offset)."""
+    offsets = {
+        datetime(year, month, 1, 12, tzinfo=tz).utcoffset()
+        for year in range(first_year, last_year + 1)
+        for month in (1, 7)
+    }
+    if len(offsets) != 1:
+        return None
+    return offsets.pop() // _ONE_MS
+
+
+class TradingCalendar:
+    """Trading days compiled into a sorted ordinal array.
+
+    Membership is a set lookup and previous/next trading day a bisect, so
+    callers never sort or scan the multi-decade calendar.
+    """
+
+    def __init__(self, dates: Iterable[str], closed_dates: Iterable[str] = ()) -> None:
+        closed = {date.fromisoformat(value).toordinal() for value in closed_dates}
+        ordinals = {date.fromisoformat(value).toordinal() for value in dates}
+        self._ordinals = sorted(ordinals - closed)
+        self._members = frozenset(self._ordinals)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.toordinal() in self._members
+
+    def previous_trading_day(self, day: date, inclusive: bool = True) -> date | None:
+        ordinal = day.toordinal()
+        index = bisect_right(self._ordinals, ordinal if inclusive else ordinal - 1) - 1
+        if index < 0:
+            return None
+        return date.fromordinal(self._ordinals[index])
+
+    def next_trading_day(self, day: date, inclusive: bool = True) -> date | None:
+        ordinal = day.toordinal()
+        index = bisect_left(self._ordinals, ordinal if inclusive else ordinal + 1)
+        if index >= len(self._ordinals):
+            return None
+        return date.fromordinal(self._ordinals[index])
+
+    def trading_days(self, start: date, end: date) -> list[date]:
+        lo = bisect_left(self._ordinals, start.toordinal())
+        hi = bisect_right(self._ordinals, end.toordinal())
+        return [date.fromordinal(ordinal) for ordinal in self._ordinals[lo:hi]]
+
+
+class TradingClock:
+    def __init__(
+        self,
+        tz_name: str,
+        sessions: str,
+        special_sessions: dict[str, list[tuple[time, time]]],
+        closed_dates: set[str],
+    ) -> None:
+        self._tz = ZoneInfo(tz_name)
+        self._utc_offset_ms = fixed_utc_offset_ms(self._tz)
+        self._sessions = _to_offsets(_parse_sessions(sessions))
+        self._special_sessions = {
+            date.fromisoformat(day).toordinal(): _to_offsets(value)
+            for day, value in special_sessions.items()
+        }
+        self._closed_dates = closed_dates
+        self._closed_ordinals = frozenset(date.fromisoformat(day).toordinal() for day in closed_dates)
+        self._calendar: TradingCalendar | None = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> TradingClock:
+        return cls(
+            settings.timezone,
+            settings.trading_sessions,
+            _parse_special_sessions(settings.special_trading_sessions),
+            _parse_closed_dates(settings.closed_dates),
+        )
+
+    @property
+    def tz(self) -> ZoneInfo:
+        return self._tz
+
+    @property
+    def utc_offset_ms(self) -> int | None:
+        """Fixed UTC offset of the market zone, None when it has DST."""
+        return self._utc_offset_ms
+
+    @property
+    def calendar_size(self) -> int:
+        return len(self._calendar) if self._calendar is not None else 0
+
+    def now(self) -> datetime:
+        return datetime.now(tz=self._tz)
+
+    def is_trading_time(self, dt: datetime) -> bool:
+        dt = dt.astimezone(self._tz)
+        day = dt.date()
+        if not self.is_trading_day(day):
+            return False
+        seconds = dt.hour * 3600 + dt.minute * 60 + dt.second
+        return any(start <= seconds <= end for start, end in self.sessions_for(day))
+
+    def is_trading_day(self, day: date | datetime) -> bool:
+        if isinstance(day, datetime):
+            day = day.astimezone(self._tz).date()
+        ordinal = day.toordinal()
+        if ordinal in self._closed_ordinals:
+            return False
+        if self._calendar is None:
+            return day.weekday() < 5
+        return self._calendar.is_trading_day(day)
+
+    def sessions_for(self, day: date) -> list[Session]:
+        return self._special_sessions.get(day.toordinal(), self._sessions)
+
+    def previous_trading_day(self, day: date, inclusive: bool = True) -> date | None:
+        if self._calendar is not None:
+            return self._calendar.previous_trading_day(day, inclusive)
+        candidate = day if inclusive else day - timedelta(days=1)
+        for _ in range(_FALLBACK_SCAN_DAYS):
+            if self.is_trading_day(candidate):
+                return candidate
+            candidate -= timedelta(days=1)
+        return None
+
+    def next_trading_day(self, day: date, inclusive: bool = True) -> date | None:
+        if self._calendar is not None:
+            return self._calendar.next_trading_day(day, inclusive)
+        candidate = day if inclusive else day + timedelta(days=1)
+        for _ in range(_FALLBACK_SCAN_DAYS):
+            if self.is_trading_day(candidate):
+                return candidate
+            candidate += timedelta(days=1)
+        return None
+
+    def trading_days(self, start: date, end: date) -> list[date]:
+        if self._calendar is not None:
+            return self._calendar.trading_days(start, end)
+        days = []
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def session_bounds(self, day: date) -> list[tuple[datetime, datetime]]:
+        midnight = datetime.combine(day, time.min, tzinfo=self._tz)
+        return [
+            (midnight + timedelta(seconds=start), midnight + timedelta(seconds=end))
+            for start, end in self.sessions_for(day)
+        ]
+
+    def next_session_open(self, dt: datetime) -> datetime | None:
+        dt = dt.astimezone(self._tz)
+        day = self.next_trading_day(dt.date())
+        while day is not None:
+            for start, _ in self.session_bounds(day):
+                if start > dt:
+                    return start
+            day = self.next_trading_day(day, inclusive=False)
+        return None
+
+    def update_calendar(self, calendar: set[str]) -> None:
+        self._calendar = TradingCalendar(calendar, self._closed_dates)
+
+
+def _to_offsets(sessions: list[tuple[time, time]]) -> list[Session]:
+    return [
+        (start.hour * 3600 + start.minute * 60, end.hour * 3600 + end.minute * 60)
+        for start, end in sessions
+    ]
+
+
+def _parse_sessions(value: str) -> list[tuple[time, time]]:
+    sessions: list[tuple[time, time]] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_s, end_s = part.split("-")
+        start = _parse_time(start_s)
+        end = _parse_time(end_s)
+        sessions.append((start, end))
+    return sessions
+
+
+def _parse_time(value: str) -> time:
+    hour, minute = value.split(":")
+    return time(int(hour), int(minute))
+
+
+def _parse_special_sessions(value: str) -> dict[str, list[tuple[time, time]]]:
+    value = value.strip()
+    if not value:
+        return {}
+    try:
+        raw = json.loads(value)
+    except Exception:
+        logger.warning("invalid special_trading_sessions")
+        return {}
+    sessions: dict[str, list[tuple[time, time]]] = {}
+    for date_str, session_str in raw.items():
+        if not isinstance(session_str, str):
+            continue
+        sessions[date_str] = _parse_sessions(session_str)
+    return sessions
+
+
+def _parse_closed_dates(value: str) -> set[str]:
+    value = value.strip()
+    if not value:
+        return set()
+    return {item.strip() for item in value.split(",") if item.strip()}
@@ -5,46 +5,158 @@ from typing import Iterable
 
 from fastapi import WebSocket
 
+from klinecharts_pro_akshare_gateway.metrics import Gauge, registry
+
 
 class WebSocketHub:
+    """Connections and (symbol, period) subscriptions.
+
+    Per-connection, per-IP and per-symbol counts are kept incrementally so
+    that admission checks and removals cost O(1) and O(own subscriptions)
+    rather than a scan of every subscription.
+    """
+
     def __init__(self) -> None:
         self._subs: dict[tuple[str, str], set[WebSocket]] = defaultdict(set)
-        self._active_symbols: set[str] = set()
+        self._ws_subs: dict[WebSocket, set[tuple[str, str]]] = defaultdict(set)
+        self._symbol_subs: dict[str, int] = {}
+        self._subscription_count = 0
+        self._connections: dict[WebSocket, str] = {}
+        self._ip_counts: dict[str, int] = {}
+        self._indicators: dict[tuple[WebSocket, str, str], tuple[str, ...]] = {}
 
-    def subscribe(self, ws: WebSocket, symbol: str, period: str) -> None:
-        self._subs[(symbol, period)].add(ws)
-        self._active_symbols.add(symbol)
+    def connect(self, ws: WebSocket, ip: str = "") -> None:
+        if ws in self._connections:
+            return
+        self._connections[ws] = ip
+        self._ip_counts[ip] = self._ip_counts.get(ip, 0) + 1
 
-    def unsubscribe(self, ws: WebSocket, symbol: str, period: str) -> None:
+    def admit(self, ws: WebSocket, ip: str, max_connections: int, max_per_ip: int) -> str | None:
+        """Connects ``ws`` unless a cap (0 = unlimited) is reached, in which
+        case the reason is returned and nothing is recorded."""
+        if max_connections and len(self._connections) >= max_connections:
+            return "connections"
+        if max_per_ip and self._ip_counts.get(ip, 0) >= max_per_ip:
+            return "connections_per_ip"
+        self.connect(ws, ip)
+        return None
+
+    def subscription_rejection(
+        self,
+        ws: WebSocket,
+        symbol: str,
+        period: str,
+        max_per_connection: int,
+        max_total: int,
+        max_symbols: int,
+    ) -> str | None:
+        """Why a new subscription would exceed a cap (0 = unlimited), or
+        None. Re-subscribing to an existing (symbol, period) always passes."""
+        if (symbol, period) in self._ws_subs.get(ws, ()):
+            return None
+        if max_per_connection and len(self._ws_subs.get(ws, ())) >= max_per_connection:
+            return "subscriptions_per_connection"
+        if max_total and self._subscription_count >= max_total:
+            return "subscriptions"
+        if max_symbols and symbol not in self._symbol_subs and len(self._symbol_subs) >= max_symbols:
+            return "active_symbols"
+        return None
+
+    def subscribe(
+        self, ws: WebSocket, symbol: str, period: str, indicators: tuple[str, ...] = ()
+    ) -> None:
         key = (symbol, period)
-        self._subs[key].discard(ws)
-        if not self._subs[key]:
-            self._subs.pop(key, None)
-        self._rebuild_active_symbols()
+        group = self._subs[key]
+        if ws not in group:
+            group.add(ws)
+            self._ws_subs[ws].add(key)
+            self._symbol_subs[symbol] = self._symbol_subs.get(symbol, 0) + 1
+            self._subscription_count += 1
+        if indicators:
+            self._indicators[(ws, symbol, period)] = indicators
+        else:
+            self._indicators.pop((ws, symbol, period), None)
+
+    def unsubscribe(self, ws: WebSocket, symbol: str, period: str) -> None:
+        self._drop(ws, (symbol, period))
+        keys = self._ws_subs.get(ws)
+        if keys is not None:
+            keys.discard((symbol, period))
+            if not keys:
+                del self._ws_subs[ws]
 
     def remove(self, ws: WebSocket) -> None:
-        for key in list(self._subs.keys()):
-            self._subs[key].discard(ws)
-            if not self._subs[key]:
-                self._subs.pop(key, None)
-        self._rebuild_active_symbols()
+        ip = self._connections.pop(ws, None)
+        if ip is not None:
+            remaining = self._ip_counts[ip] - 1
+            if remaining:
+                self._ip_counts[ip] = remaining
+            else:
+                del self._ip_counts[ip]
+        for key in self._ws_subs.pop(ws, ()):
+            self._drop(ws, key)
 
     def get_active_symbols(self) -> list[str]:
-        return sorted(self._active_symbols)
+        return sorted(self._symbol_subs)
+
+    def indicators_for(self, ws: WebSocket, symbol: str, period: str) -> tuple[str, ...]:
+        return self._indicators.get((ws, symbol, period), ())
+
+    def indicator_keys(self) -> set[tuple[str, str, str]]:
+        return {
+            (symbol, period, key)
+            for (_, symbol, period), keys in self._indicators.items()
+            for key in keys
+        }
+
+    def active_symbol_count(self) -> int:
+        return len(self._symbol_subs)
+
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    def subscription_count(self) -> int:
+        return self._subscription_count
 
     def iter_subscribers(self, symbol: str, period: str) -> Iterable[WebSocket]:
         return list(self._subs.get((symbol, period), set()))
 
     def iter_all(self) -> Iterable[WebSocket]:
-        seen: set[WebSocket] = set()
-        for group in self._subs.values():
-            for ws in group:
-                if ws not in seen:
-                    seen.add(ws)
-                    yield ws
+        return list(self._ws_subs)
 
-    def _rebuild_active_symbols(self) -> None:
-        self._active_symbols = {symbol for symbol, _ in self._subs.keys()}
+    def _drop(self, ws: WebSocket, key: tuple[str, str]) -> None:
+        self._indicators.pop((ws, *key), None)
+        group = self._subs.get(key)
+        if group is None or ws not in group:
+            return
+        group.discard(ws)
+        if not group:
+            del self._subs[key]
+        self._subscription_count -= 1
+        symbol = key[0]
+        remaining = self._symbol_subs[symbol] - 1
+        if remaining:
+            self._symbol_subs[symbol] = remaining
+        else:
+            del self._symbol_subs[symbol]
 
 
 hub = WebSocketHub()
+
+registry.register(
+    Gauge("gateway_ws_connections", "Open WebSocket connections.", callback=hub.connection_count)
+)
+registry.register(
+    Gauge(
+        "gateway_ws_subscriptions",
+        "WebSocket (connection, symbol, period) subscriptions.",
+        callback=hub.subscription_count,
+    )
+)
+registry.register(
+    Gauge(
+        "gateway_active_symbols",
+        "Symbols polled for realtime snapshots.",
+        callback=hub.active_symbol_count,
+    )
+)
@@ -1,17 +1,47 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from klinecharts_pro_akshare_gateway.models import ErrorEvent, SubscribeAck, SubscribeRequest
+from klinecharts_pro_akshare_gateway.indicators.kernels import IndicatorSpec, InvalidIndicatorError
+from klinecharts_pro_akshare_gateway.metrics import WS_REAPED, WS_REJECTIONS
+from klinecharts_pro_akshare_gateway.models import (
+    BarEvent,
+    ErrorEvent,
+    PingEvent,
+    SubscribeAck,
+    SubscribeRequest,
+)
 from klinecharts_pro_akshare_gateway.ws.hub import hub
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+_CLOSE_GOING_AWAY = 1001
+_CLOSE_TRY_AGAIN_LATER = 1013
+
 
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket) -> None:
-    await ws.accept()
+    settings = ws.app.state.settings
+    client_ip = ws.client.host if ws.client else ""
+    reason = hub.admit(ws, client_ip, settings.ws_max_connections, settings.ws_max_connections_per_ip)
+    if reason is not None:
+        # Closing before accept refuses the upgrade with a plain HTTP 403,
+        # so a connection storm never reaches the WebSocket handshake.
+        WS_REJECTIONS.inc(reason)
+        await ws.close(code=_CLOSE_TRY_AGAIN_LATER)
+        return
+    engine = ws.app.state.indicator_engine
     try:
-        while True:
-            data = await ws.receive_json()
+        await ws.accept()
+        messages = _receive_with_heartbeat(
+            ws, settings.ws_ping_interval_seconds, settings.ws_ping_timeout_seconds
+        )
+        async for data in messages:
             try:
                 req = SubscribeRequest.model_validate(data)
             except Exception:
@@ -19,11 +49,120 @@ async def websocket_endpoint(ws: WebSocket) -> None:
                 continue
 
             if req.op == "subscribe":
-                hub.subscribe(ws, req.symbol, req.period)
+                if await _reject_subscription(ws, req, settings):
+                    continue
+                try:
+                    keys = await _prepare_indicators(engine, req)
+                except InvalidIndicatorError as exc:
+                    await ws.send_json(ErrorEvent(op="error", reason=str(exc)).model_dump())
+                    continue
+                if keys and await _reject_subscription(ws, req, settings):
+                    # Other connections may have taken the last slots while seeding.
+                    continue
+                hub.subscribe(ws, req.symbol, req.period, keys)
+                if engine is not None:
+                    engine.prune(hub.indicator_keys())
                 await ws.send_json(
-                    SubscribeAck(op="subscribed", symbol=req.symbol, period=req.period).model_dump()
+                    SubscribeAck(
+                        op="subscribed",
+                        symbol=req.symbol,
+                        period=req.period,
+                        indicators=list(keys) or None,
+                    ).model_dump()
                 )
+                await _send_current_bar(ws, req.symbol, req.period)
             else:
                 hub.unsubscribe(ws, req.symbol, req.period)
+                if engine is not None:
+                    engine.prune(hub.indicator_keys())
+        # The heartbeat gave up on the client: drop it from fan-out first,
+        # then close without waiting on a peer that may never answer.
+        hub.remove(ws)
+        try:
+            async with asyncio.timeout(settings.ws_ping_timeout_seconds or None):
+                await ws.close(code=_CLOSE_GOING_AWAY)
+        except Exception:
+            pass
     except WebSocketDisconnect:
+        pass
+    finally:
         hub.remove(ws)
+        if engine is not None:
+            engine.prune(hub.indicator_keys())
+
+
+async def _receive_with_heartbeat(
+    ws: WebSocket, interval: float, timeout: float
+) -> AsyncIterator[object]:
+    """Yields client messages. After ``interval`` seconds without one the
+    server sends a ping; any message (normally ``{"op": "pong"}``) within
+    ``timeout`` seconds keeps the connection, otherwise iteration ends.
+    Zero disables pinging or reaping respectively."""
+    awaiting_reply = False
+    while True:
+        try:
+            async with asyncio.timeout((timeout if awaiting_reply else interval) or None):
+                data = await ws.receive_json()
+        except TimeoutError:
+            if awaiting_reply:
+                WS_REAPED.inc()
+                return
+            try:
+                async with asyncio.timeout(timeout or None):
+                    await ws.send_json(PingEvent(op="ping", ts=_now_ms()).model_dump())
+            except TimeoutError:
+                WS_REAPED.inc()
+                return
+            awaiting_reply = True
+            continue
+        awaiting_reply = False
+        op = data.get("op") if isinstance(data, dict) else None
+        if op == "pong":
+            continue
+        if op == "ping":
+            await ws.send_json(PingEvent(op="pong", ts=_now_ms()).model_dump())
+            continue
+        yield data
+
+
+async def _reject_subscription(ws: WebSocket, req: SubscribeRequest, settings) -> bool:
+    reason = hub.subscription_rejection(
+        ws,
+        req.symbol,
+        req.period,
+        settings.ws_max_subscriptions_per_connection,
+        settings.ws_max_subscriptions,
+        settings.max_active_symbols,
+    )
+    if reason is None:
+        return False
+    WS_REJECTIONS.inc(reason)
+    await ws.send_json(ErrorEvent(op="error", reason=f"subscription limit reached: {reason}").model_dump())
+    return True
+
+
+async def _send_current_bar(ws: WebSocket, symbol: str, period: str) -> None:
+    # With the full-market store the forming bar is known before the next
+    # poll, so the chart can paint immediately.
+    market = ws.app.state.bar_builder.market
+    bar = market.current(symbol, period) if market is not None else None
+    if bar is not None:
+        await ws.send_json(BarEvent(op="bar", symbol=symbol, period=period, bar=bar).model_dump())
+
+
+async def _prepare_indicators(engine, req: SubscribeRequest) -> tuple[str, ...]:
+    if not req.indicators:
+        return ()
+    if engine is None:
+        raise InvalidIndicatorError("indicators disabled")
+    specs = [IndicatorSpec.parse(item) for item in req.indicators]
+    try:
+        await engine.ensure(req.symbol, req.period, specs)
+    except Exception as exc:
+        logger.exception("indicator seed failed for %s %s", req.symbol, req.period)
+        raise InvalidIndicatorError("indicator seed failed") from exc
+    return tuple(dict.fromkeys(spec.key for spec in specs))
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
@@ -0,0 +1,45 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from klinecharts_pro_akshare_gateway.cache.memory import MemoryCache
+from klinecharts_pro_akshare_gateway.config import Settings
+from klinecharts_pro_akshare_gateway.history import HistoryService
+from klinecharts_pro_akshare_gateway.models import Bar
+from klinecharts_pro_akshare_gateway.provider.async_provider import AsyncProvider
+
+TZ = ZoneInfo("Asia/Shanghai")
+
+
+class DailyProvider:
+    """One bar per weekday with a steadily rising close; records each call."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[date, date]] = []
+
+    def get_daily_history(self, symbol: str, start: date, end: date) -> list[Bar]:
+        self.calls.append((start, end))
+        bars = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                ts = int(datetime.combine(day, time.min, tzinfo=TZ).timestamp() * 1000)
+                close = 10 + (day - date(2000, 1, 1)).days * 0.01 + (day.toordinal() % 7) * 0.1
+                bars.append(Bar(ts=ts, open=close, high=close + 0.1, low=close - 0.1, close=close, volume=100.0))
+            day += timedelta(days=1)
+        return bars
+
+
+@pytest.fixture
+def daily_provider() -> DailyProvider:
+    return DailyProvider()
+
+
+@pytest.fixture
+def history_service(daily_provider: DailyProvider) -> HistoryService:
+    return HistoryService(AsyncProvider(daily_provider), MemoryCache(), Settings())
+
+
+def day_ms(day: date) -> int:
+    return int(datetime.combine(day, time.min, tzinfo=TZ).timestamp() * 1000)
@@ -0,0 +1,29 @@
+import pytest
+
+from klinecharts_pro_akshare_gateway.provider.circuit import CircuitBreakerProvider, CircuitOpenError
+
+
+class _Provider:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+    def search_symbols(self, q, limit):
+        raise self.error
+
+
+def test_request_errors_do_not_open_the_circuit():
+    provider = CircuitBreakerProvider(_Provider(KeyError("日期")), failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(KeyError):
+            provider.search_symbols("bad", 1)
+    assert provider.stats()["search_symbols"]["state"] == "closed"
+
+
+def test_transport_errors_open_the_circuit():
+    provider = CircuitBreakerProvider(_Provider(ConnectionError("reset")), failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            provider.search_symbols("x", 1)
+    with pytest.raises(CircuitOpenError):
+        provider.search_symbols("x", 1)
+
@@ -0,0 +1,27 @@
+import json
+import math
+
+from klinecharts_pro_akshare_gateway.encoding import encode_columnar
+from klinecharts_pro_akshare_gateway.models import Bar, HistoryResponse
+
+
+def _bar(ts: int, price: float, volume: float = 100.0) -> Bar:
+    return Bar(ts=ts, open=price, high=price, low=price, close=price, volume=volume)
+
+
+def test_columnar_round_trips_prices():
+    bars = [_bar(1_000, 10.01), _bar(61_000, 10.25)]
+    out = encode_columnar(HistoryResponse(symbol="x", period="1m", items=bars), 3)
+    closes = [(out.price_base + value) / out.price_scale for value in out.close]
+    assert closes == [10.01, 10.25]
+    assert out.ts_delta == [0, 60_000]
+
+
+def test_columnar_encodes_non_finite_values_as_null():
+    bars = [_bar(1_000, math.nan, math.nan), _bar(61_000, 10.0), _bar(121_000, math.inf)]
+    out = encode_columnar(HistoryResponse(symbol="x", period="1d", items=bars), 3)
+    assert out.price_base == 10_000
+    assert out.close == [None, 0, None]
+    assert out.volume == [None, 100, 100]
+    payload = json.loads(out.model_dump_json())
+    assert payload["open"] == [None, 0, None]
@@ -0,0 +1,21 @@
+import asyncio
+from datetime import date
+
+from conftest import day_ms
+
+
+def test_misses_around_a_fresh_chunk_are_fetched_separately(history_service, daily_provider):
+    asyncio.run(history_service.get_page("x", "1d", day_ms(date(2021, 1, 1)), day_ms(date(2022, 1, 1)) - 1, 2000))
+    daily_provider.calls.clear()
+
+    page = asyncio.run(
+        history_service.get_page("x", "1d", day_ms(date(2020, 1, 1)), day_ms(date(2023, 1, 1)) - 1, 2000)
+    )
+
+    assert daily_provider.calls == [
+        (date(2020, 1, 1), date(2020, 12, 31)),
+        (date(2022, 1, 1), date(2022, 12, 31)),
+    ]
+    stamps = {item.ts for item in page.items}
+    assert len(stamps) == len(page.items)
+    assert day_ms(date(2021, 6, 1)) in stamps
@@ -0,0 +1,36 @@
+import asyncio
+from datetime import date
+
+import pytest
+from conftest import day_ms
+
+from klinecharts_pro_akshare_gateway.indicators.engine import IndicatorEngine
+from klinecharts_pro_akshare_gateway.indicators.kernels import IndicatorSpec
+
+SPECS = [IndicatorSpec.parse(value) for value in ("MA", "BOLL", "RSI", "EMA", "MACD")]
+
+
+def test_adjacent_pages_match_one_combined_page(history_service):
+    engine = IndicatorEngine(history_service)
+    start, end = day_ms(date(2020, 1, 1)), day_ms(date(2024, 1, 1)) - 1
+
+    async def run():
+        first = await history_service.get_page("x", "1d", start, end, 150)
+        second = await history_service.get_page("x", "1d", start, end, 150, anchor_ms=first.newer.ts)
+        combined = await history_service.get_page("x", "1d", start, end, 300)
+        assert [bar.ts for bar in first.items + second.items] == [bar.ts for bar in combined.items]
+        return (
+            await engine.series("x", "1d", SPECS, first.items),
+            await engine.series("x", "1d", SPECS, second.items),
+            await engine.series("x", "1d", SPECS, combined.items),
+        )
+
+    first, second, combined = asyncio.run(run())
+    for spec in SPECS:
+        for name, values in combined[spec.key].items():
+            paged = first[spec.key][name] + second[spec.key][name]
+            if spec.name in {"EMA", "MACD"}:
+                assert paged == pytest.approx(values, abs=2e-4)
+            else:
+                assert paged == values
+            assert None not in values
@@ -0,0 +1,31 @@
+import asyncio
+from datetime import date, datetime
+
+from conftest import TZ
+
+from klinecharts_pro_akshare_gateway.models import Bar
+from klinecharts_pro_akshare_gateway.store.minute import MinuteBarStore, MinuteBarWriter
+
+
+def _bar(day: date, hour: int, minute: int) -> Bar:
+    ts = int(datetime(day.year, day.month, day.day, hour, minute, tzinfo=TZ).timestamp() * 1000)
+    return Bar(ts=ts, open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0, is_closed=True)
+
+
+def test_has_day_only_reports_days_with_bars(tmp_path):
+    monday, tuesday = date(2024, 3, 4), date(2024, 3, 5)
+    writer = MinuteBarWriter(MinuteBarStore(tmp_path / "bars.sqlite"))
+    writer.add("600000.SH", _bar(monday, 9, 31))
+    writer.add("600000.SH", _bar(monday, 23, 59))
+
+    assert writer.has_day("600000.SH", monday)
+    assert not writer.has_day("600000.SH", tuesday)
+    assert not writer.has_day("600001.SH", monday)
+
+    asyncio.run(writer.flush())
+    assert writer.has_day("600000.SH", monday)
+    assert not writer.has_day("600000.SH", tuesday)
+
+    writer.add("600000.SH", _bar(tuesday, 0, 0))
+    assert writer.has_day("600000.SH", tuesday)
+    writer.store.close()
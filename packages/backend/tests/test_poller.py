@@ -0,0 +1,234 @@
+import asyncio
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from klinecharts_pro_akshare_gateway.barbuilder.builder import BarBuilder
+from klinecharts_pro_akshare_gateway.barbuilder.market import MarketBars
+from klinecharts_pro_akshare_gateway.config import Settings
+from klinecharts_pro_akshare_gateway.models import Bar, Snapshot
+from klinecharts_pro_akshare_gateway.poller import Poller, _broadcast_bar, _broadcast_status
+from klinecharts_pro_akshare_gateway.trading_calendar import TradingClock
+from klinecharts_pro_akshare_gateway.ws.hub import hub
+
+
+class _Socket:
+    def __init__(self, closed: bool = False) -> None:
+        self.closed = closed
+        self.sent: list[dict] = []
+
+    async def send_json(self, payload: dict) -> None:
+        if self.closed:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+        self.sent.append(payload)
+
+
+def test_failed_send_drops_the_socket_and_reaches_the_rest():
+    closed, alive = _Socket(closed=True), _Socket()
+    for ws in (closed, alive):
+        hub.connect(ws)
+        hub.subscribe(ws, "600000.SH", "1m")
+    bar = Bar(ts=0, open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0)
+    try:
+        asyncio.run(_broadcast_bar("600000.SH", "1m", bar))
+        asyncio.run(_broadcast_status("hello"))
+        assert [message["op"] for message in alive.sent] == ["bar", "status"]
+        assert closed not in hub.iter_subscribers("600000.SH", "1m")
+    finally:
+        hub.remove(closed)
+        hub.remove(alive)
+
+
+def test_stalled_send_times_out_and_drops_the_socket():
+    class _Stalled(_Socket):
+        async def send_json(self, payload: dict) -> None:
+            await asyncio.Event().wait()
+
+    stalled, alive = _Stalled(), _Socket()
+    for ws in (stalled, alive):
+        hub.connect(ws)
+        hub.subscribe(ws, "600000.SH", "1m")
+    bar = Bar(ts=0, open=1.0, high=1.0, low=1.0, close=1.0, volume=1.0)
+    try:
+        asyncio.run(_broadcast_bar("600000.SH", "1m", bar, timeout=0.05))
+        assert [message["op"] for message in alive.sent] == ["bar"]
+        assert stalled not in hub.iter_subscribers("600000.SH", "1m")
+    finally:
+        hub.remove(stalled)
+        hub.remove(alive)
+
+
+def test_publish_errors_do_not_end_the_poll_loop():
+    settings = Settings()
+    clock = TradingClock.from_settings(settings)
+
+    class _Provider:
+        calls = 0
+
+        async def get_trading_calendar(self):
+            return set()
+
+        async def get_realtime_snapshot_batch(self, symbols):
+            _Provider.calls += 1
+            return {}
+
+    poller = Poller(_Provider(), BarBuilder(clock), settings, clock=clock)
+    clock.is_trading_time = lambda now: True
+    settings.snapshot_poll_interval_seconds = 0
+
+    async def failing_publish(snapshots, active=None):
+        raise RuntimeError("boom")
+
+    poller.publish = failing_publish
+    ws = _Socket()
+    hub.connect(ws)
+    hub.subscribe(ws, "600000.SH", "1m")
+
+    async def run():
+        poller.start()
+        while _Provider.calls < 3 and not poller._task.done():
+            await asyncio.sleep(0.01)
+        assert not poller._task.done()
+        await poller.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        hub.remove(ws)
+
+
+def test_failed_calendar_load_is_retried_after_a_backoff():
+    settings = Settings()
+    clock = TradingClock.from_settings(settings)
+
+    class _Provider:
+        calls = 0
+
+        async def get_trading_calendar(self):
+            _Provider.calls += 1
+            if _Provider.calls == 1:
+                raise OSError("upstream down")
+            return {"2024-01-02"}
+
+    poller = Poller(_Provider(), BarBuilder(clock), settings, clock=clock)
+    today = clock.now().date()
+
+    asyncio.run(poller._refresh_calendar(today))
+    assert poller._calendar_date is None
+    assert poller._calendar_retry_at > time.monotonic()
+
+    asyncio.run(poller._refresh_calendar(today))
+    assert poller._calendar_date == today
+    assert _Provider.calls == 2
+
+
+def test_replay_polls_outside_trading_hours():
+    settings = Settings(provider_backend="replay", snapshot_poll_interval_seconds=0)
+    clock = TradingClock.from_settings(settings)
+    clock.is_trading_time = lambda now: False
+
+    class _Provider:
+        calls = 0
+
+        async def get_trading_calendar(self):
+            return set()
+
+        async def get_realtime_snapshot_batch(self, symbols):
+            _Provider.calls += 1
+            return {}
+
+    poller = Poller(_Provider(), BarBuilder(clock), settings, clock=clock)
+    ws = _Socket()
+    hub.connect(ws)
+    hub.subscribe(ws, "600000.SH", "1m")
+
+    async def run():
+        poller.start()
+        for _ in range(100):
+            if _Provider.calls:
+                break
+            await asyncio.sleep(0.01)
+        await poller.stop()
+
+    try:
+        asyncio.run(run())
+        assert _Provider.calls > 0
+    finally:
+        hub.remove(ws)
+
+
+def test_market_minutes_are_persisted_for_unsubscribed_symbols():
+    settings = Settings()
+    clock = TradingClock.from_settings(settings)
+    market = MarketBars(clock, 64 * 1024 * 1024)
+
+    class _Writer:
+        def __init__(self) -> None:
+            self.added: list[tuple[str, Bar]] = []
+
+        def add(self, symbol: str, bar: Bar) -> None:
+            self.added.append((symbol, bar))
+
+    writer = _Writer()
+    poller = Poller(None, BarBuilder(clock, market=market), settings, clock=clock, minute_writer=writer)
+
+    def snapshots(minute: int, volume: float) -> dict[str, Snapshot]:
+        ts = datetime(2024, 1, 2, 9, minute, 10, tzinfo=ZoneInfo(settings.timezone))
+        return {
+            symbol: Snapshot(ts=ts, last=10.0, volume_total=volume, amount_total=volume * 10)
+            for symbol in ("600000.SH", "000001.SZ")
+        }
+
+    async def run():
+        await poller.publish(snapshots(30, 100.0), {"600000.SH"})
+        await poller.publish(snapshots(31, 150.0), {"600000.SH"})
+        await poller._dispatch(poller._bar_builder.close_intraday())
+
+    asyncio.run(run())
+    assert sorted((symbol, bar.ts) for symbol, bar in writer.added) == sorted(
+        (symbol, bar.ts) for symbol in ("600000.SH", "000001.SZ") for bar in market.bars(symbol, "1m")
+    )
+    assert len(writer.added) == 4
+
+
+def test_first_minute_after_a_restart_is_not_persisted():
+    settings = Settings()
+    tz = ZoneInfo(settings.timezone)
+
+    class _Writer:
+        def __init__(self) -> None:
+            self.added: list[tuple[str, Bar]] = []
+
+        def add(self, symbol: str, bar: Bar) -> None:
+            self.added.append((symbol, bar))
+
+    def snapshots(minute: int, second: int, volume: float) -> dict[str, Snapshot]:
+        ts = datetime(2024, 1, 2, 10, minute, second, tzinfo=tz)
+        return {
+            symbol: Snapshot(ts=ts, last=10.0, volume_total=volume, amount_total=volume * 10)
+            for symbol in ("600000.SH", "000001.SZ")
+        }
+
+    def new_poller(writer: _Writer) -> Poller:
+        clock = TradingClock.from_settings(settings)
+        builder = BarBuilder(clock, market=MarketBars(clock, 64 * 1024 * 1024))
+        return Poller(None, builder, settings, clock=clock, minute_writer=writer)
+
+    writer = _Writer()
+
+    async def run():
+        before = new_poller(writer)
+        await before.publish(snapshots(15, 10, 1000.0), {"600000.SH"})
+        await before.publish(snapshots(15, 40, 1100.0), {"600000.SH"})
+        # Restarted within 10:15: the fresh builder only sees the day total.
+        after = new_poller(writer)
+        await after.publish(snapshots(15, 50, 1200.0), {"600000.SH"})
+        await after.publish(snapshots(16, 10, 1300.0), {"600000.SH"})
+        await after._dispatch(after._bar_builder.close_intraday())
+
+    asyncio.run(run())
+    minute = int(datetime(2024, 1, 2, 10, 16, tzinfo=tz).timestamp() * 1000)
+    assert sorted((symbol, bar.ts, bar.volume) for symbol, bar in writer.added) == [
+        ("000001.SZ", minute, 100.0),
+        ("600000.SH", minute, 100.0),
+    ]
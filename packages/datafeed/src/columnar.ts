@@ -0,0 +1,41 @@
+import type { Bar } from "./types";
+
+export type ColumnarHistory = {
+  format: "columnar";
+  ts_start: number | null;
+  ts_delta: number[];
+  price_scale: number;
+  price_base: number;
+  open: Array<number | null>;
+  high: Array<number | null>;
+  low: Array<number | null>;
+  close: Array<number | null>;
+  volume: Array<number | null>;
+  amount: Array<number | null>;
+};
+
+// Non-finite values (e.g. suspended rows) are encoded as null.
+const price = (value: number | null, base: number, scale: number) =>
+  value === null ? Number.NaN : (base + value) / scale;
+
+export function decodeColumnarHistory(data: ColumnarHistory): Bar[] {
+  const count = data.ts_delta.length;
+  const bars: Bar[] = new Array(count);
+  const scale = data.price_scale;
+  const base = data.price_base;
+  let ts = data.ts_start ?? 0;
+  for (let i = 0; i < count; i += 1) {
+    ts += data.ts_delta[i];
+    bars[i] = {
+      timestamp: ts,
+      open: price(data.open[i], base, scale),
+      high: price(data.high[i], base, scale),
+      low: price(data.low[i], base, scale),
+      close: price(data.close[i], base, scale),
+      volume: data.volume[i] ?? Number.NaN,
+      amount: data.amount[i],
+      isClosed: true,
+    };
+  }
+  return bars;
+}
@@ -1,8 +1,10 @@
+import { decodeColumnarHistory, type ColumnarHistory } from "./columnar";
 import type { Bar, Datafeed, Period, SymbolInfo } from "./types";
 
 type DatafeedOptions = {
   baseUrl: string;
   wsUrl?: string;
+  historyFormat?: "json" | "columnar";
   onWsStatus?: (status: "open" | "close" | "error" | "reconnect") => void;
 };
 
@@ -13,6 +15,7 @@ type Subscription = {
 export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed {
   const baseUrl = options.baseUrl.replace(/\/$/, "");
   const wsUrl = options.wsUrl ?? baseUrl.replace(/^http/, "ws");
+  const historyFormat = options.historyFormat ?? "columnar";
   const subscriptions = new Map<string, Subscription>();
   let ws: WebSocket | null = null;
   let reconnectDelay = 1000;
@@ -33,6 +36,10 @@ export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed
     };
     ws.onmessage = (event) => {
       const payload = JSON.parse(event.data);
+      if (payload.op === "ping") {
+        ws?.send(JSON.stringify({ op: "pong", ts: payload.ts }));
+        return;
+      }
       if (payload.op !== "bar") {
         return;
       }
@@ -106,6 +113,7 @@ export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed
       period: toPeriodId(period),
       from: String(from),
       to: String(to),
+      format: historyFormat,
     });
     if (limit) {
       params.set("limit", String(limit));
@@ -114,7 +122,8 @@ export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed
     if (!res.ok) {
       throw new Error("history failed");
     }
-    const data = (await res.json()) as {
+    const data = (await res.json()) as ColumnarHistory | {
+      format?: undefined;
       items: Array<{
         ts: number;
         open: number;
@@ -126,6 +135,9 @@ export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed
         is_closed?: boolean;
       }>;
     };
+    if (data.format === "columnar") {
+      return decodeColumnarHistory(data);
+    }
     return data.items.map((item) => ({
       timestamp: item.ts,
       open: item.open,
@@ -173,3 +185,5 @@ export function createAkshareGatewayDatafeed(options: DatafeedOptions): Datafeed
 }
 
 export type { Bar, Datafeed, Period, SymbolInfo } from "./types";
+export { decodeColumnarHistory } from "./columnar";
+export type { ColumnarHistory } from "./columnar";